@@ -1,6 +1,11 @@
 """
 Vercel serverless adapter for FastAPI application
 """
+import os
+
+# Mark the serverless environment before the app is imported so heavy initialization stays lazy
+os.environ.setdefault("VERCEL", "1")
+
 from src.app import app
 from mangum import Mangum
 
@@ -5,8 +5,115 @@ Script to embed the book content into Qdrant RAG system
 
 import os
 import sys
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
 from pathlib import Path
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Number of markdown files sent per /api/embed request
+EMBED_BATCH_SIZE = 64
+# Number of embed requests in flight at once
+EMBED_MAX_WORKERS = 8
+# Retries for rate-limited (429) embed requests
+EMBED_MAX_RETRIES = 5
+# Timeout in seconds for requests that don't pass their own
+DEFAULT_TIMEOUT = 30
+
+
+class _TimeoutHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that applies a default timeout to every request
+    """
+
+    def __init__(self, *args, timeout=DEFAULT_TIMEOUT, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+# Shared keep-alive session so every call to the backend reuses pooled connections
+_session = requests.Session()
+_adapter = _TimeoutHTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.2)
+)
+_session.mount("http://", _adapter)
+_session.mount("https://", _adapter)
+
+
+def _walk_md(root):
+    """
+    Collect markdown file paths under root as plain strings
+    """
+    found = []
+    for dirpath, _, files in os.walk(root):
+        found.extend(os.path.join(dirpath, f) for f in files if f.endswith(".md"))
+    return found
+
+
+def _find_markdown_files(root):
+    """
+    Collect markdown file paths under root, walking each top-level subdirectory in parallel
+    """
+    md_files = []
+    subdirs = []
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            elif entry.name.endswith(".md"):
+                md_files.append(entry.path)
+
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for found in executor.map(_walk_md, subdirs):
+            md_files.extend(found)
+    return md_files
+
+
+def _batched(items, size):
+    """
+    Split items into lists of at most `size` elements
+    """
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _post_embed_batch(backend_url, file_paths):
+    """
+    POST one batch of files to the embed endpoint, backing off exponentially on 429s
+    """
+    embed_data = {
+        "file_paths": file_paths,
+        "collection_name": "book_content"
+    }
+
+    delay = 1.0
+    for attempt in range(EMBED_MAX_RETRIES + 1):
+        response = _session.post(
+            f"{backend_url}/api/embed",
+            json=embed_data,
+            timeout=300  # 5 minute timeout per batch
+        )
+        if response.status_code != 429 or attempt == EMBED_MAX_RETRIES:
+            return response
+
+        retry_after = response.headers.get("Retry-After")
+        wait = float(retry_after) if retry_after and retry_after.isdigit() else delay
+        print(f"  Rate limited, retrying batch in {wait:.1f}s...")
+        time.sleep(wait)
+        delay *= 2
 
 def embed_book_content():
     """
@@ -25,7 +132,7 @@ def embed_book_content():
         return False
 
     # Check if there are markdown files in docs
-    md_files = list(docs_dir.rglob("*.md"))
+    md_files = _find_markdown_files(str(docs_dir.resolve()))
     if not md_files:
         print(f"No markdown files found in {docs_dir}")
         return False
@@ -33,14 +140,14 @@ def embed_book_content():
     print(f"Found {len(md_files)} markdown files to embed")
     print("Files to be processed:")
     for file in md_files[:10]:  # Show first 10 files
-        print(f"  - {file.relative_to(project_root)}")
+        print(f"  - {Path(file).relative_to(project_root.resolve())}")
     if len(md_files) > 10:
         print(f"  ... and {len(md_files) - 10} more files")
 
     # Check if backend is running
     backend_url = "http://127.0.0.1:8001"
     try:
-        response = requests.get(f"{backend_url}/api/health")
+        response = _session.get(f"{backend_url}/api/health")
         if response.status_code == 200:
             print(f"✓ Backend is running at {backend_url}")
         else:
@@ -51,42 +158,54 @@ def embed_book_content():
         print("Please start the backend with: cd backend && python -m uvicorn src.api.main:app --host 127.0.0.1 --port 8000 --reload")
         return False
 
-    # Prepare the embed request
-    embed_data = {
-        "source_path": str(docs_dir.resolve()),
-        "collection_name": "book_content"
-    }
+    # Split the files into batches that are embedded concurrently
+    batches = list(_batched(md_files, EMBED_BATCH_SIZE))
 
     print(f"\nEmbedding content from: {docs_dir.resolve()}")
-    print("Sending request to backend...")
+    print(f"Sending {len(batches)} batch(es) of up to {EMBED_BATCH_SIZE} files to backend...")
 
     try:
-        response = requests.post(
-            f"{backend_url}/api/embed",
-            json=embed_data,
-            timeout=300  # 5 minute timeout for large documents
-        )
+        total_files = 0
+        failed_batches = 0
 
-        if response.status_code == 200:
-            result = response.json()
-            print(f"✓ Embedding completed successfully!")
-            print(f"  Status: {result.get('status', 'unknown')}")
-            print(f"  Message: {result.get('message', 'No message')}")
-            print(f"  Total files processed: {result.get('total_files', 0)}")
-            print(f"  Job ID: {result.get('job_id', 'N/A')}")
-
-            # Check the embeddings count
-            count_response = requests.get(f"{backend_url}/api/embeddings/count")
-            if count_response.status_code == 200:
-                count_data = count_response.json()
-                print(f"  Total embeddings in Qdrant: {count_data.get('count', 0)}")
-
-            return True
-        else:
-            print(f"✗ Embedding request failed with status {response.status_code}")
-            print(f"  Response: {response.text}")
+        def handle_response(batch_number, response):
+            nonlocal total_files, failed_batches
+            if response.status_code == 200:
+                result = response.json()
+                total_files += result.get('total_files', 0)
+                print(f"  ✓ Batch {batch_number}/{len(batches)}: {result.get('status', 'unknown')} "
+                      f"({result.get('total_files', 0)} files)")
+            else:
+                failed_batches += 1
+                print(f"  ✗ Batch {batch_number}/{len(batches)} failed with status {response.status_code}")
+                print(f"    Response: {response.text}")
+
+        # The first batch runs alone so the collection exists before concurrent batches start
+        handle_response(1, _post_embed_batch(backend_url, batches[0]))
+
+        with ThreadPoolExecutor(max_workers=EMBED_MAX_WORKERS) as executor:
+            futures = {
+                executor.submit(_post_embed_batch, backend_url, batch): number
+                for number, batch in enumerate(batches[1:], start=2)
+            }
+            for future in as_completed(futures):
+                handle_response(futures[future], future.result())
+
+        if failed_batches:
+            print(f"✗ {failed_batches} of {len(batches)} embedding batches failed")
             return False
 
+        print(f"✓ Embedding completed successfully!")
+        print(f"  Total files processed: {total_files}")
+
+        # Check the embeddings count
+        count_response = _session.get(f"{backend_url}/api/embeddings/count")
+        if count_response.status_code == 200:
+            count_data = count_response.json()
+            print(f"  Total embeddings in Qdrant: {count_data.get('count', 0)}")
+
+        return True
+
     except requests.exceptions.Timeout:
         print("✗ Embedding request timed out. This might take a while for large documents.")
         print("  The embedding process might still be running in the background.")
@@ -102,7 +221,7 @@ def check_embeddings_count():
     backend_url = "http://127.0.0.1:8001"
 
     try:
-        response = requests.get(f"{backend_url}/api/embeddings/count")
+        response = _session.get(f"{backend_url}/api/embeddings/count")
         if response.status_code == 200:
             data = response.json()
             print(f"Current embeddings count: {data.get('count', 0)}")
@@ -3,14 +3,52 @@ Agent implementation for the Book RAG Chatbot
 Uses OpenAI Agents SDK with Gemini 2.5 Flash via OpenAI-style external provider
 """
 import os
-import json
-from typing import Dict, Any, List
-import google.generativeai as genai
-from .connection import connection_manager
+import functools
+from difflib import SequenceMatcher
+from typing import Dict, Any, List, Optional
+from .connection import connection_manager, search_batcher
+from .services.semantic_cache import ExactMatchCache, SemanticCache, SEMANTIC_CACHE_ENABLED
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Minimum query/chunk cosine similarity for a chunk to be included in the prompt
+_MIN_RELEVANCE_SCORE = 0.35
+
+# Maximum number of retrieved chunks summarized into the prompt, and their labels
+_MAX_CONTEXT_CHUNKS = 3
+_SOURCE_LABELS = tuple(f"[Source {i} - " for i in range(1, _MAX_CONTEXT_CHUNKS + 1))
+
+@functools.lru_cache(maxsize=1)
+def _get_safety_settings() -> Dict[Any, Any]:
+    """
+    Safety settings to reduce false positives on textbook content.
+    Built on first use so the google.generativeai stack isn't imported with this module.
+    """
+    from google.generativeai.types import HarmCategory, HarmBlockThreshold
+
+    return {
+        HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
+        HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
+        HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
+        HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
+    }
+
+# Generation config shared by all attempts; only the temperature changes per retry
+_GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "max_output_tokens": 1500,
+    "top_p": 0.95,
+    "top_k": 40,
+}
+
+# Query classification vocabulary
+_GREETINGS = frozenset({'hi', 'hello', 'hey', 'greetings', 'howdy'})
+_MULTIWORD_GREETINGS = frozenset({'good morning', 'good afternoon', 'good evening'})
+_THANKS = frozenset({'thanks', 'thx', 'ty', 'appreciate'})
+_PUNCTUATION_TABLE = str.maketrans('', '', '!?.,')
+
+
 class RAGQueryTool:
     """
     Tool for content retrieval from book database
@@ -18,18 +56,18 @@ class RAGQueryTool:
     def __init__(self):
         self.connection = connection_manager
 
-    def __call__(self, query: str, mode: str, top_k: int) -> Dict[str, Any]:
+    async def __call__(self, query: str, mode: str, top_k: int, query_embedding: Optional[List[float]] = None) -> Dict[str, Any]:
         """
         Execute content retrieval based on mode
         """
         try:
-            # Generate embedding for the query
-            query_embeddings = self.connection.embed([query])
-            query_embedding = query_embeddings[0]
-
             if mode == "rag":
-                # Full-book RAG mode - search Qdrant
-                results = self.connection.qdrant_search(query_embedding, top_k)
+                # Generate embedding for the query unless the caller already has it
+                if query_embedding is None:
+                    query_embedding = (await self.connection.embed_async([query]))[0]
+
+                # Full-book RAG mode - search Qdrant (batched with any concurrent searches)
+                results = await search_batcher.search(query_embedding, top_k)
             elif mode == "selected":
                 # Selected-text mode - use provided text
                 # For this mode, we'll return the query itself as context
@@ -58,6 +96,8 @@ class BookRAGAgent:
         self.connection = connection_manager
         self.rag_query_tool = rag_query_tool
         self.model = self.connection.chat_model
+        self.response_cache = ExactMatchCache()
+        self.semantic_cache = SemanticCache() if SEMANTIC_CACHE_ENABLED else None
 
         # System instructions - designed for clean, natural responses
         self.system_instructions = """You are a friendly AI assistant helping students learn about Physical AI and Humanoid Robotics.
@@ -77,30 +117,29 @@ RESPONSE FORMAT:
 
     def _classify_query(self, message: str) -> str:
         """Classify the user's message type"""
-        message_lower = message.lower().strip()
-        words = message_lower.split()
+        stripped = message.strip()
+        message_lower = stripped.lower()
+        words = message_lower.translate(_PUNCTUATION_TABLE).split()
 
         # Greetings
-        greeting_words = ['hi', 'hello', 'hey', 'greetings', 'good morning', 'good afternoon', 'good evening', 'howdy']
-        if any(message_lower == word or (len(words) <= 2 and word in words) for word in greeting_words):
+        if message_lower in _MULTIWORD_GREETINGS or (len(words) <= 2 and not _GREETINGS.isdisjoint(words)):
             return 'greeting'
 
         # Thanks
-        thanks_words = ['thanks', 'thank you', 'thx', 'ty', 'appreciate']
-        if len(words) <= 3 and any(word in message_lower for word in thanks_words):
+        if len(words) <= 3 and ('thank you' in message_lower or not _THANKS.isdisjoint(words)):
             return 'thanks'
 
         # Very short ambiguous queries (1-3 chars like "ros", "ai")
-        if len(message.strip()) <= 3 and message.strip().isalpha():
+        if len(stripped) <= 3 and stripped.isalpha():
             return 'short_query'
 
         # Single word queries that need context
-        if len(words) == 1 and len(message.strip()) > 3:
+        if len(words) == 1 and len(stripped) > 3:
             return 'short_query'
 
         return 'knowledge'
 
-    def run(self, message: str, selected_text: str = None) -> Dict[str, Any]:
+    async def run(self, message: str, selected_text: str = None) -> Dict[str, Any]:
         """
         Execute the agent with the given message
         """
@@ -151,28 +190,54 @@ RESPONSE FORMAT:
                         "context_used": False
                     }
 
+            # Verbatim repeats (in either mode) are answered without any model calls
+            cached = self.response_cache.get(message, selected_text)
+            if cached is not None:
+                return cached
+
             # Determine mode based on whether selected text is provided
             mode = "selected" if selected_text else "rag"
 
+            # Embed the query once; it is shared by the semantic cache and the retrieval tool.
+            # Selected-text mode answers from the selection itself and needs no embedding.
+            query_embedding = (await self.connection.embed_async([message]))[0] if mode == "rag" else None
+
+            # Answers in selected-text mode depend on the selection, so only full-book queries are cached
+            if self.semantic_cache is not None and query_embedding is not None:
+                cached = self.semantic_cache.get(query_embedding)
+                if cached is not None:
+                    return cached
+
             # Call the rag_query tool to retrieve relevant context
             if mode == "selected":
-                context_result = self.rag_query_tool(selected_text, mode, top_k=5)
+                context_result = await self.rag_query_tool(selected_text, mode, top_k=5)
             else:
-                context_result = self.rag_query_tool(message, mode, top_k=5)
+                context_result = await self.rag_query_tool(message, mode, top_k=5, query_embedding=query_embedding)
 
             # Extract context from results
             context_chunks = context_result["results"]
 
-            # Limit content size and create a more structured summary to avoid recitation triggers
-            # Take only the top 3 most relevant chunks and truncate each to 300 chars
+            # Limit content size and create a more structured summary to avoid recitation triggers.
+            # Take only the top 3 chunks whose similarity to the query clears the relevance bar
+            # (Qdrant's score is already the query/chunk cosine) and truncate each to 300 chars.
+            relevant_chunks = [
+                chunk for chunk in context_chunks[:_MAX_CONTEXT_CHUNKS]
+                if chunk.get("relevance_score", 0.0) >= _MIN_RELEVANCE_SCORE
+            ]
+
             summarized_chunks = []
-            for i, chunk in enumerate(context_chunks[:3]):
-                if chunk["content"]:
-                    content = chunk["content"]
-                    # Truncate long content
-                    if len(content) > 300:
-                        content = content[:300] + "..."
-                    summarized_chunks.append(f"[Source {i+1} - {chunk.get('section', 'Unknown')}]:\n{content}")
+            message_lower = message.lower()
+            for label, chunk in zip(_SOURCE_LABELS, relevant_chunks):
+                content = chunk["content"]
+                if not content:
+                    continue
+                # Chunks that closely echo the question are the likeliest recitation triggers, so keep them shorter
+                matcher = SequenceMatcher(None, message_lower, content[:200].lower())
+                max_length = 150 if matcher.real_quick_ratio() > 0.5 and matcher.ratio() > 0.5 else 300
+                # Truncate long content
+                if len(content) > max_length:
+                    content = content[:max_length] + "..."
+                summarized_chunks.append(f"{label}{chunk.get('section', 'Unknown')}]:\n{content}")
 
             context_text = "\n\n".join(summarized_chunks)
 
@@ -184,49 +249,27 @@ Here's relevant information from the textbook:
 
 Provide a clear, natural explanation in 2-3 paragraphs. Write conversationally - no bullet points, no meta-commentary, no mention of "sources" or "context". Just explain the concept clearly."""
 
-            # Generate response using Gemini with safety settings to reduce false positives
-            from google.generativeai.types import HarmCategory, HarmBlockThreshold
-
-            safety_settings = {
-                HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-                HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-                HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-                HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-            }
+            general_prompt = f"""Explain "{message}" in the context of robotics and humanoid systems. Write 2 clear, helpful paragraphs."""
 
-            # Try with progressively shorter context if recitation is detected
-            max_retries = 3
+            # Use the textbook context first; if it is blocked for recitation, fall straight back to
+            # general knowledge. With no relevant context, go to general knowledge directly.
+            prompts = [full_prompt, general_prompt] if summarized_chunks else [general_prompt]
             answer = None
+            generated = False  # True only when the model produced an unblocked answer
 
-            for attempt in range(max_retries):
+            for attempt, prompt_to_use in enumerate(prompts):
+                is_last_attempt = attempt == len(prompts) - 1
                 try:
-                    # On retry, progressively reduce context
-                    prompt_to_use = full_prompt
-                    if attempt == 1:
-                        # Second attempt: Shorter context
-                        logger.info(f"Retry {attempt + 1}: Using reduced context")
-                        if context_chunks:
-                            short_content = context_chunks[0]["content"][:150] + "..."
-                            prompt_to_use = f"""A student asks: "{message}"
-
-Reference: {short_content}
-
-Explain this naturally in 2 paragraphs."""
-
-                    elif attempt == 2:
-                        # Third attempt: General knowledge
+                    if attempt > 0:
                         logger.info(f"Retry {attempt + 1}: Using general knowledge")
-                        prompt_to_use = f"""Explain "{message}" in the context of robotics and humanoid systems. Write 2 clear, helpful paragraphs."""
 
-                    response = self.model.generate_content(
+                    response = await self.model.generate_content_async(
                         prompt_to_use,
                         generation_config={
-                            "temperature": 0.7 + (attempt * 0.15),  # Increase temperature on retry
-                            "max_output_tokens": 1500,
-                            "top_p": 0.95,
-                            "top_k": 40,
+                            **_GENERATION_CONFIG,
+                            "temperature": _GENERATION_CONFIG["temperature"] + (attempt * 0.15),  # Increase temperature on retry
                         },
-                        safety_settings=safety_settings
+                        safety_settings=_get_safety_settings()
                     )
 
                     # Check if response was blocked (FinishReason 12)
@@ -238,15 +281,16 @@ Explain this naturally in 2 paragraphs."""
                                 logger.warning(f"Attempt {attempt + 1}: Response blocked (FinishReason 12)")
                                 break
 
-                    if was_blocked and attempt < max_retries - 1:
-                        # Try again with even less context
+                    if was_blocked and not is_last_attempt:
+                        # Try again without the textbook context
                         continue
 
                     # Extract text from response
                     answer = self._extract_answer_from_response(response)
+                    generated = not was_blocked
 
                     # If still blocked after all retries, provide helpful message
-                    if was_blocked and attempt == max_retries - 1:
+                    if was_blocked:
                         logger.info("All retry attempts exhausted, providing fallback message")
                         answer = "I understand you're asking about this topic. While I'm having trouble generating a detailed response, I can tell you that the relevant information can be found in the sections listed below. Please refer to those sections for a complete explanation."
 
@@ -254,38 +298,39 @@ Explain this naturally in 2 paragraphs."""
 
                 except Exception as e:
                     logger.error(f"Attempt {attempt + 1} error: {str(e)}")
-                    if attempt == max_retries - 1:
+                    if is_last_attempt:
                         answer = "I'm having trouble answering right now. Please try again or rephrase your question."
                         break
 
-            # Format and deduplicate sources aggressively
-            sources = []
-            seen_sections = set()
-
-            for chunk in context_chunks:
+            # Format and deduplicate sources aggressively, keeping the first chunk per section.
+            # Only chunks that cleared the relevance bar (and so could inform the answer) are cited.
+            unique_sources = {}
+            for chunk in relevant_chunks:
                 section = chunk.get("section", "Unknown")
-
-                # Skip if we've already seen this section
-                if section in seen_sections:
-                    continue
-
-                seen_sections.add(section)
-                sources.append({
-                    "file_path": chunk.get("file_path", ""),
-                    "section": section,
-                    "relevance_score": chunk.get("relevance_score", 0.0)
-                })
-
-                # Stop after 3 unique sections
-                if len(sources) >= 3:
-                    break
+                if section not in unique_sources:
+                    unique_sources[section] = {
+                        "file_path": chunk.get("file_path", ""),
+                        "section": section,
+                        "relevance_score": chunk.get("relevance_score", 0.0)
+                    }
+                    # Stop after 3 unique sections
+                    if len(unique_sources) == 3:
+                        break
+            sources = list(unique_sources.values())
 
             logger.info(f"Agent run completed successfully - Answer length: {len(answer)}, Sources: {len(sources)}")
-            return {
+            result = {
                 "answer": answer,
                 "sources": sources,
-                "context_used": bool(context_chunks)
+                "context_used": bool(summarized_chunks)
             }
+
+            if generated:
+                self.response_cache.put(message, selected_text, result)
+                if self.semantic_cache is not None and query_embedding is not None:
+                    self.semantic_cache.put(query_embedding, result)
+
+            return result
         except Exception as e:
             logger.error(f"Error running agent: {str(e)}", exc_info=True)
             # Return more detailed error message for debugging
@@ -1,6 +1,7 @@
 from fastapi import Request, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
+import hmac
 import os
 import logging
 
@@ -10,6 +11,16 @@ logger = logging.getLogger(__name__)
 API_KEY = os.getenv("API_KEY", "")
 API_KEY_NAME = "X-API-Key"
 
+# Expected key as bytes, precomputed once for constant-time comparison
+_API_KEY_BYTES = API_KEY.encode("utf-8") if API_KEY else b""
+
+
+def _is_valid_api_key(candidate: str) -> bool:
+    """
+    Compare a provided key against API_KEY in constant time
+    """
+    return hmac.compare_digest(candidate.encode("utf-8"), _API_KEY_BYTES)
+
 
 class APIKeySecurity:
     """
@@ -37,7 +48,7 @@ class APIKeySecurity:
                     detail="API key is missing"
                 )
 
-            if api_key_header != API_KEY:
+            if not _is_valid_api_key(api_key_header):
                 logger.warning(f"Invalid API key provided by {request.client.host}")
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
@@ -56,7 +67,7 @@ def verify_api_key(credentials: HTTPAuthorizationCredentials = None) -> Optional
         # If no API key is configured, skip verification
         return None
 
-    if credentials and credentials.credentials == API_KEY:
+    if credentials and _is_valid_api_key(credentials.credentials):
         return credentials.credentials
     else:
         logger.warning("Invalid API key provided")
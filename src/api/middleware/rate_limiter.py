@@ -1,12 +1,13 @@
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
+from slowapi.middleware import SlowAPIASGIMiddleware
 from fastapi import FastAPI
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Initialize the rate limiter
+# Initialize the rate limiter shared by every router
 limiter = Limiter(key_func=get_remote_address)
 
 
@@ -18,6 +19,9 @@ def setup_rate_limiter(app: FastAPI):
     app.state.limiter = limiter
     app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
+    # Pure ASGI middleware, avoiding the extra task and memory stream BaseHTTPMiddleware adds per request
+    app.add_middleware(SlowAPIASGIMiddleware)
+
     logger.info("Rate limiting setup completed")
 
 
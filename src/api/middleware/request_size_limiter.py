@@ -1,64 +1,112 @@
-import asyncio
-from fastapi import Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import Request
+from fastapi.responses import ORJSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 # Maximum request size in bytes (10MB)
 MAX_REQUEST_SIZE = 10 * 1024 * 1024  # 10MB
 
+# Methods whose requests carry no body worth checking
+_SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "DELETE"})
+
+# Wall-clock source for response timestamps
+_now = time.time
+
+
+class _BodyTooLarge(Exception):
+    """
+    Raised from the wrapped receive when a streamed body passes the limit. Deliberately not an
+    HTTPException, so the app's exception middleware lets it through to RequestSizeLimiter.
+    """
+
 
 class RequestSizeLimiter:
     """
-    Middleware to limit request size to prevent abuse
+    Middleware to limit request size to prevent abuse.
+    Implemented as plain ASGI so no Request/Response objects are built for requests that pass.
     """
 
-    def __init__(self, max_size: int = MAX_REQUEST_SIZE):
+    def __init__(self, app: ASGIApp, max_size: int = MAX_REQUEST_SIZE):
+        self.app = app
         self.max_size = max_size
 
-    async def __call__(self, request: Request, call_next):
+    def _too_large_response(self, detail: str) -> ORJSONResponse:
+        return ORJSONResponse(
+            status_code=413,
+            content={
+                "error": "Request body too large",
+                "details": detail,
+                "timestamp": _now()
+            }
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        # Bodyless methods have nothing to check, so skip buffering entirely
+        if scope["type"] != "http" or scope["method"] in _SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        client = scope.get("client")
+        client_host = client[0] if client else "unknown"
+
         # Check content length header first (if available)
-        content_length = request.headers.get('content-length')
+        content_length = None
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                content_length = value
+                break
+
         if content_length:
             try:
                 size = int(content_length)
+            except ValueError:
+                # If content-length header is not a valid integer, count the body as it arrives
+                size = None
+
+            if size is not None:
                 if size > self.max_size:
-                    logger.warning(f"Request too large: {size} bytes from {request.client.host}")
-                    raise HTTPException(
-                        status_code=413,
-                        detail=f"Request too large: {size} bytes. Maximum allowed: {self.max_size} bytes"
+                    logger.warning(f"Request too large: {size} bytes from {client_host}")
+                    response = self._too_large_response(
+                        f"Request too large: {size} bytes. Maximum allowed: {self.max_size} bytes"
                     )
-            except ValueError:
-                # If content-length header is not a valid integer, continue to read body
-                pass
+                    await response(scope, receive, send)
+                    return
+                # The server enforces the declared length, so the body can stream straight to the endpoint
+                await self.app(scope, receive, send)
+                return
 
         # For streaming requests or when content-length is not available,
-        # we'll read the body and check its size
-        body = b""
-        try:
-            async for chunk in request.stream():
-                body += chunk
-                if len(body) > self.max_size:
-                    logger.warning(f"Request body too large: {len(body)} bytes from {request.client.host}")
-                    return JSONResponse(
-                        status_code=413,
-                        content={
-                            "error": "Request body too large",
-                            "details": f"Request body exceeds maximum size of {self.max_size} bytes",
-                            "timestamp": __import__('time').time()
-                        }
-                    )
+        # count body bytes as the application reads them
+        total_size = 0
+        response_started = False
 
-            # Set the body back to the request for further processing
-            request._body = body
-            request.state.body_size = len(body)
-        except Exception as e:
-            logger.error(f"Error reading request body: {str(e)}")
-            raise HTTPException(status_code=400, detail="Error reading request body")
+        async def limited_receive() -> Message:
+            nonlocal total_size
+            message = await receive()
+            if message["type"] == "http.request":
+                total_size += len(message.get("body", b""))
+                if total_size > self.max_size:
+                    logger.warning(f"Request body too large: {total_size} bytes from {client_host}")
+                    raise _BodyTooLarge(f"Request body exceeds maximum size of {self.max_size} bytes")
+            return message
 
-        response = await call_next(request)
-        return response
+        async def tracking_send(message: Message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except _BodyTooLarge as e:
+            # Too late to answer if the endpoint already started its response
+            if response_started:
+                raise
+            response = self._too_large_response(str(e))
+            await response(scope, receive, send)
 
 
 async def get_body(request: Request):
@@ -1,6 +1,8 @@
 """
 API Routes Package for Book RAG Chatbot
+
+Route modules are imported individually (e.g. `from .api.routes import query_routes`)
+so that mounting one router doesn't initialize the services behind the others.
 """
-from . import health_routes, embed_routes, log_routes, query_routes
 
-__all__ = ["health_routes", "embed_routes", "log_routes", "query_routes"]
\ No newline at end of file
+__all__ = ["health_routes", "embed_routes", "log_routes", "query_routes"]
@@ -1,63 +1,102 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Request
-from typing import Optional, Dict, Any
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+from typing import Optional, Dict, Any, List
 from pydantic import BaseModel, Field
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-import asyncio
+import os
+import stat
+import time
 
+from ..middleware.rate_limiter import limiter, DEFAULT_LIMIT, EMBED_LIMIT
 from ...services.embedding_service import embedding_service
 
-# Create a limiter for this router with a lower limit for embedding operations
-limiter = Limiter(key_func=get_remote_address)
-
 router = APIRouter()
 
+# Embedding count cache: polled endpoints reuse a recent count instead of querying Qdrant each time
+_COUNT_TTL = 5.0
+_count_cache = {"ts": 0.0, "val": 0, "collection_name": None}
+
 
 class EmbedRequest(BaseModel):
-    source_path: str = Field(..., description="Path to the book content directory")
+    source_path: Optional[str] = Field(None, description="Path to the book content directory")
+    file_paths: Optional[List[str]] = Field(None, description="Explicit list of markdown files to embed (used for batched ingest)")
     collection_name: str = Field("book_content", description="Name of the Qdrant collection to use")
 
 
-@router.post("/embed")
-@limiter.limit("10/minute")
-async def embed_endpoint(request: Request, embed_request: EmbedRequest) -> Dict[str, Any]:
+def _validate_embed_paths(embed_request: EmbedRequest) -> None:
     """
-    Regenerate embeddings from all MD files and push to vector database
+    Check that the requested files or source directory exist (blocking filesystem calls)
     """
-    try:
-        # Validate source path exists
-        import os
-        if not os.path.exists(embed_request.source_path):
+    if embed_request.file_paths:
+        # Validate every file in the batch exists
+        missing = [path for path in embed_request.file_paths if not os.path.isfile(path)]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Files do not exist: {missing[:5]}")
+    elif embed_request.source_path:
+        # Validate source path exists and is a directory (a single stat call)
+        try:
+            source_stat = os.stat(embed_request.source_path)
+        except OSError:
             raise HTTPException(status_code=400, detail=f"Source path does not exist: {embed_request.source_path}")
 
-        if not os.path.isdir(embed_request.source_path):
+        if not stat.S_ISDIR(source_stat.st_mode):
             raise HTTPException(status_code=400, detail=f"Source path is not a directory: {embed_request.source_path}")
+    else:
+        raise HTTPException(status_code=400, detail="Either source_path or file_paths must be provided")
+
+
+@router.post("/embed", response_model=None)
+@limiter.limit(EMBED_LIMIT)
+async def embed_endpoint(request: Request, embed_request: EmbedRequest) -> Dict[str, Any]:
+    """
+    Regenerate embeddings from all MD files and push to vector database
+    """
+    try:
+        # Filesystem checks and the embedding job block, so keep them off the event loop
+        await run_in_threadpool(_validate_embed_paths, embed_request)
 
         # Process the embedding request
-        result = embedding_service.regenerate_embeddings(
+        result = await run_in_threadpool(
+            embedding_service.regenerate_embeddings,
             source_path=embed_request.source_path,
-            collection_name=embed_request.collection_name
+            collection_name=embed_request.collection_name,
+            file_paths=embed_request.file_paths
         )
 
-        return result
+        return ORJSONResponse(result)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing embedding request: {str(e)}")
 
 
-@router.get("/embeddings/count")
-@limiter.limit("100/minute")
+@router.get("/embeddings/count", response_model=None)
+@limiter.limit(DEFAULT_LIMIT)
 async def embeddings_count_endpoint(request: Request) -> Dict[str, Any]:
     """
     Get the total count of embeddings in the vector database
     """
-    try:
-        count = embedding_service.count_embeddings()
-        return {
+    collection_name = embedding_service.qdrant_service.collection_name
+    cached = _count_cache["collection_name"] == collection_name
+    now = time.monotonic()
+
+    if cached and now - _count_cache["ts"] < _COUNT_TTL:
+        count = _count_cache["val"]
+    else:
+        try:
+            count = await run_in_threadpool(embedding_service.count_embeddings)
+            _count_cache.update(ts=now, val=count, collection_name=collection_name)
+        except Exception as e:
+            if not cached:
+                raise HTTPException(status_code=500, detail=f"Error getting embeddings count: {str(e)}")
+            # Serve the last known count if Qdrant is unavailable
+            count = _count_cache["val"]
+
+    return ORJSONResponse(
+        {
             "count": count,
-            "collection_name": embedding_service.qdrant_service.collection_name,
-            "timestamp": __import__('time').time()
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error getting embeddings count: {str(e)}")
\ No newline at end of file
+            "collection_name": collection_name,
+            "timestamp": time.time()
+        },
+        headers={"Cache-Control": f"public, max-age={int(_COUNT_TTL)}"}
+    )
\ No newline at end of file
@@ -1,7 +1,8 @@
 from fastapi import Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from typing import Dict, Any
 import logging
+import secrets
 import traceback
 import time
 
@@ -18,20 +19,23 @@ class APIErrorHandler:
         """
         Handle validation errors and return standardized error response
         """
-        error_id = f"err_{int(time.time())}_{hash(str(exc)) % 10000:04d}"
+        now = time.time()
+        error_id = f"err_{int(now)}_{secrets.token_hex(3)}"
+        details = str(exc)
+        message = getattr(exc, 'detail', details)
 
         error_response = {
-            "error": exc.detail if hasattr(exc, 'detail') else "Validation error",
-            "details": str(exc),
-            "timestamp": time.time(),
+            "error": message if hasattr(exc, 'detail') else "Validation error",
+            "details": details,
+            "timestamp": now,
             "request_id": error_id,
             "path": request.url.path,
             "method": request.method
         }
 
-        logger.error(f"Validation error {error_id}: {exc.detail if hasattr(exc, 'detail') else str(exc)}")
+        logger.error(f"Validation error {error_id}: {message}")
 
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=exc.status_code if hasattr(exc, 'status_code') else 422,
             content=error_response
         )
@@ -41,33 +45,50 @@ class APIErrorHandler:
         """
         Handle general errors and return standardized error response
         """
-        error_id = f"err_{int(time.time())}_{hash(str(exc)) % 10000:04d}"
+        now = time.time()
+        error_id = f"err_{int(now)}_{secrets.token_hex(3)}"
 
         error_response = {
             "error": "Internal server error",
             "details": "An unexpected error occurred",
-            "timestamp": time.time(),
+            "timestamp": now,
             "request_id": error_id,
             "path": request.url.path,
             "method": request.method
         }
 
-        # Log the full traceback for debugging
-        logger.error(f"Internal error {error_id}: {str(exc)}\n{traceback.format_exc()}")
+        # Log the full traceback for debugging (formatting it is skipped if errors aren't logged)
+        if logger.isEnabledFor(logging.ERROR):
+            logger.error(f"Internal error {error_id}: {str(exc)}\n{traceback.format_exc()}")
 
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500,
             content=error_response
         )
 
 
-# Create middleware to add request ID to each request
-async def add_request_id_middleware(request: Request, call_next):
+class RequestIDMiddleware:
     """
-    Middleware to add a unique request ID to each request
+    Pure ASGI middleware that adds a unique request ID to each request
+    and returns it in the X-Request-ID response header
     """
-    request_id = f"req_{int(time.time())}_{hash(str(request.url) + str(time.time())) % 10000:04d}"
-    request.state.request_id = request_id
-    response = await call_next(request)
-    response.headers["X-Request-ID"] = request_id
-    return response
\ No newline at end of file
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = f"req_{int(time.time())}_{secrets.token_hex(4)}"
+        # Exposed to endpoints as request.state.request_id
+        scope.setdefault("state", {})["request_id"] = request_id
+        request_id_header = (b"x-request-id", request_id.encode("latin-1"))
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), request_id_header]
+            await send(message)
+
+        await self.app(scope, receive, send_with_request_id)
@@ -5,7 +5,7 @@ import time
 router = APIRouter()
 
 
-@router.get("/health")
+@router.get("/health", response_model=None, include_in_schema=False)
 async def health_check() -> Dict[str, Any]:
     """
     Health check endpoint to verify the service is running and dependencies are accessible.
@@ -1,18 +1,15 @@
 from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse
 from typing import Optional, Dict, Any
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 
+from ..middleware.rate_limiter import limiter, DEFAULT_LIMIT
 from ...services.postgres_service import postgres_service
 
-# Create a limiter for this router
-limiter = Limiter(key_func=get_remote_address)
-
 router = APIRouter()
 
 
-@router.get("/logs")
-@limiter.limit("100/minute")
+@router.get("/logs", response_model=None)
+@limiter.limit(DEFAULT_LIMIT)
 async def get_logs_endpoint(
     request: Request,
     limit: int = Query(20, ge=1, le=100, description="Number of logs to return"),
@@ -23,12 +20,13 @@ async def get_logs_endpoint(
     Retrieve paginated chat logs from the database
     """
     try:
-        result = postgres_service.get_logs(
+        result = await postgres_service.get_logs(
             limit=limit,
             offset=offset,
             mode=mode
         )
 
-        return result
+        # Plain JSON-native dict, so skip jsonable_encoder and serialize it directly
+        return ORJSONResponse(result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving logs: {str(e)}")
\ No newline at end of file
@@ -1,47 +1,114 @@
-from fastapi import APIRouter, HTTPException
-from typing import Optional, Dict, Any
-from pydantic import BaseModel, Field
-import uuid
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse
+from typing import Optional, List
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, ValidationError
+import logging
+import secrets
 
-from ...app import book_rag_agent
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 class ChatRequest(BaseModel):
-    message: str = Field(..., min_length=1, max_length=1000, description="The user's message/question")
-    selected_text: Optional[str] = Field(None, min_length=10, max_length=5000, description="Text selected by user for selected-text mode")
+    model_config = ConfigDict(extra='ignore', frozen=True)
+
+    message: str = Field(..., description="The user's message/question")
+    selected_text: Optional[str] = Field(None, description="Text selected by user for selected-text mode")
     session_id: Optional[str] = Field(None, description="Session identifier for conversation continuity")
 
 
-@router.post("/chat")
-async def chat_endpoint(request: ChatRequest) -> Dict[str, Any]:
+class Source(BaseModel):
+    file_path: str
+    section: str
+    relevance_score: float
+
+
+class ChatResponse(BaseModel):
+    answer: str
+    sources: List[Source]
+    session_id: str
+
+
+# Responses are assembled with model_construct, skipping validation. This relies on the agent's
+# contract: run() returns a str answer and source dicts with exactly the Source fields.
+
+
+# Lazy import for agent to avoid initialization issues in serverless
+_book_rag_agent = None
+
+
+def get_book_rag_agent():
+    """Lazy initialization of the RAG agent"""
+    global _book_rag_agent
+    if _book_rag_agent is None:
+        from ...agent import book_rag_agent
+        _book_rag_agent = book_rag_agent
+    return _book_rag_agent
+
+
+# Built once so request bodies are validated straight from JSON bytes
+_CHAT_ADAPTER = TypeAdapter(ChatRequest)
+
+
+@router.post(
+    "/chat",
+    response_model=ChatResponse,
+    openapi_extra={"requestBody": {"required": True, "content": {"application/json": {"schema": ChatRequest.model_json_schema()}}}}
+)
+async def chat_endpoint(http_request: Request) -> ChatResponse:
     """
     Main chat endpoint that processes user messages through the RAG agent
     """
     try:
+        request = _CHAT_ADAPTER.validate_json(await http_request.body())
+    except ValidationError as e:
+        # Same shape as FastAPI's own body validation errors
+        raise RequestValidationError([{**error, "loc": ("body", *error["loc"])} for error in e.errors()])
+
+    try:
+        # Validate message length
+        if len(request.message.strip()) < 5:
+            logger.warning(f"Message too short: {len(request.message.strip())} characters")
+            raise HTTPException(status_code=400, detail="Message must be at least 5 characters long")
+
+        # Use provided session_id or generate a new one
+        session_id = request.session_id or secrets.token_urlsafe(16)
+
+        logger.info(f"Chat request received - Session: {session_id}, Message length: {len(request.message)}, Has selected text: {bool(request.selected_text)}")
+
+        # Get the RAG agent
+        agent = get_book_rag_agent()
+
         # Process the message through the agent
-        result = book_rag_agent.run(
+        result = await agent.run(
             message=request.message,
             selected_text=request.selected_text
         )
 
-        # Use provided session_id or generate a new one
-        session_id = request.session_id or str(uuid.uuid4())
+        # Validate result structure
+        if not result or "answer" not in result or "sources" not in result:
+            logger.error(f"Invalid agent result structure: {result}")
+            raise HTTPException(status_code=500, detail="Agent returned invalid response structure")
 
-        response = {
-            "answer": result["answer"],
-            "sources": result["sources"],
-            "session_id": session_id
-        }
+        # Create response from the trusted agent result without re-validating it
+        response = ChatResponse.model_construct(
+            answer=result["answer"],
+            sources=[Source.model_construct(**source) for source in result["sources"]],
+            session_id=session_id
+        )
 
-        return response
+        logger.info(f"Chat response sent - Session: {session_id}, Answer length: {len(result['answer'])}, Sources count: {len(result['sources'])}")
+        # Serialize directly instead of through jsonable_encoder
+        return ORJSONResponse(content=response.model_dump(exclude_none=True))
 
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
     except Exception as e:
+        logger.error(f"Error in chat endpoint: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error processing chat request: {str(e)}")
 
 
 # Include the new route in the router
-__all__ = ["router"]
\ No newline at end of file
+__all__ = ["router"]
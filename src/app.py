@@ -2,11 +2,19 @@
 FastAPI application for the Book RAG Chatbot
 Optimized for both local development and Vercel serverless deployment
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from fastapi.responses import ORJSONResponse, Response
+from .api.middleware.request_size_limiter import RequestSizeLimiter, MAX_REQUEST_SIZE
+from .api.middleware.rate_limiter import setup_rate_limiter
+from .api.routes import query_routes
+from .api.routes.error_handlers import RequestIDMiddleware
+from .api.routes.query_routes import get_book_rag_agent
+from .config.logging_config import setup_logging, stop_logging
+import functools
+import hashlib
 import logging
+import orjson
 import os
 
 # Setup logging
@@ -20,7 +28,8 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/api/docs",
     redoc_url="/api/redoc",
-    openapi_url="/api/openapi.json"
+    openapi_url="/api/openapi.json",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -31,91 +40,63 @@ allowed_origins = [
     "http://127.0.0.1:3000",  # Local development alternative
 ]
 
+# Optional extra frontend origin (e.g. a preview deployment)
+if os.getenv("FRONTEND_ORIGIN"):
+    allowed_origins.append(os.getenv("FRONTEND_ORIGIN"))
+
+# Reject oversized request bodies before they reach the endpoints
+app.add_middleware(RequestSizeLimiter, max_size=MAX_REQUEST_SIZE)
+
+# Shared rate limiter used by the route decorators
+setup_rate_limiter(app)
+
+# Registered after the limiters so it wraps them and their 413/429 responses get CORS headers.
+# Explicit methods and headers let preflights be answered without echoing the request back,
+# and max_age lets browsers reuse a preflight for a day
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["content-type", "authorization", "x-api-key", "x-request-id"],
+    max_age=86400,
 )
 
-# Pydantic models for request/response
-class ChatRequest(BaseModel):
-    message: str
-    selected_text: Optional[str] = None
-    session_id: Optional[str] = None
-
-class Source(BaseModel):
-    file_path: str
-    section: str
-    relevance_score: float
-
-class ChatResponse(BaseModel):
-    answer: str
-    sources: List[Source]
-    session_id: str
-
-# Lazy import for agent to avoid initialization issues in serverless
-_book_rag_agent = None
-
-def get_book_rag_agent():
-    """Lazy initialization of the RAG agent"""
-    global _book_rag_agent
-    if _book_rag_agent is None:
-        from .agent import book_rag_agent
-        _book_rag_agent = book_rag_agent
-    return _book_rag_agent
-
-@app.post("/api/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest) -> ChatResponse:
+# Tag every request and response with an X-Request-ID
+app.add_middleware(RequestIDMiddleware)
+
+# Chat endpoint (POST /api/chat)
+app.include_router(query_routes.router, prefix="/api")
+
+@app.on_event("startup")
+async def configure_logging():
+    """Set up console and file logging once the server starts, rather than at import"""
+    setup_logging()
+
+@app.on_event("shutdown")
+async def flush_logging():
+    """Write out any queued log records"""
+    stop_logging()
+
+@app.on_event("startup")
+async def warm_up_agent():
     """
-    Main chat endpoint that processes user messages through the RAG agent
+    Initialize the RAG agent before the first request on long-running servers.
+    Skipped on Vercel, where startup runs per cold start and the agent is built on first use instead.
     """
+    if os.getenv("VERCEL") == "1":
+        return
     try:
-        # Validate message length
-        if len(request.message.strip()) < 5:
-            logger.warning(f"Message too short: {len(request.message.strip())} characters")
-            raise HTTPException(status_code=400, detail="Message must be at least 5 characters long")
-
-        # Use provided session_id or generate a new one
-        session_id = request.session_id or f"session_{id(request)}"
-
-        logger.info(f"Chat request received - Session: {session_id}, Message length: {len(request.message)}, Has selected text: {bool(request.selected_text)}")
-
-        # Get the RAG agent
-        agent = get_book_rag_agent()
-
-        # Process the message through the agent
-        result = agent.run(
-            message=request.message,
-            selected_text=request.selected_text
-        )
-
-        # Validate result structure
-        if not result or "answer" not in result or "sources" not in result:
-            logger.error(f"Invalid agent result structure: {result}")
-            raise HTTPException(status_code=500, detail="Agent returned invalid response structure")
-
-        # Create response
-        response = ChatResponse(
-            answer=result["answer"],
-            sources=result["sources"],
-            session_id=session_id
-        )
-
-        logger.info(f"Chat response sent - Session: {session_id}, Answer length: {len(result['answer'])}, Sources count: {len(result['sources'])}")
-        return response
-
-    except HTTPException:
-        # Re-raise HTTP exceptions
-        raise
+        get_book_rag_agent()
     except Exception as e:
-        logger.error(f"Error in chat endpoint: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Error processing chat request: {str(e)}")
+        logger.warning(f"RAG agent warm-up failed, it will be initialized on first request: {str(e)}")
 
-@app.get("/api/health")
-async def health_check():
-    """Health check endpoint with environment validation"""
+@functools.lru_cache(maxsize=1)
+def _health_body() -> bytes:
+    """
+    Serialized health check payload. The environment doesn't change while the process
+    runs, so it is checked and encoded once, on the first health check.
+    """
     # Check critical environment variables
     env_status = {
         "GEMINI_API_KEY": bool(os.getenv("GEMINI_API_KEY")),
@@ -126,23 +107,39 @@ async def health_check():
 
     all_configured = all(env_status.values())
 
-    return {
+    return orjson.dumps({
         "status": "healthy" if all_configured else "degraded",
         "service": "book-rag-chatbot",
         "environment": os.getenv("ENVIRONMENT", "development"),
         "env_configured": env_status,
         "ready": all_configured
-    }
+    })
+
+# Static API information served by the root endpoint
+_ROOT_BODY = orjson.dumps({
+    "service": "Book RAG Chatbot API",
+    "version": "1.0.0",
+    "docs": "/api/docs",
+    "health": "/api/health"
+})
+
+@functools.lru_cache(maxsize=1)
+def _health_etag() -> str:
+    """ETag of the health payload, letting pollers revalidate with a bodiless 304"""
+    return '"' + hashlib.blake2b(_health_body(), digest_size=8).hexdigest() + '"'
+
+@app.get("/api/health", include_in_schema=False)
+async def health_check(request: Request):
+    """Health check endpoint with environment validation"""
+    headers = {"Cache-Control": "public, max-age=30", "ETag": _health_etag()}
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=_health_body(), media_type="application/json", headers=headers)
 
-@app.get("/")
+@app.get("/", include_in_schema=False)
 async def root():
     """Root endpoint with API information"""
-    return {
-        "service": "Book RAG Chatbot API",
-        "version": "1.0.0",
-        "docs": "/api/docs",
-        "health": "/api/health"
-    }
+    return Response(content=_ROOT_BODY, media_type="application/json")
 
 # For local development with uvicorn
 if __name__ == "__main__":
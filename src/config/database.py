@@ -1,30 +1,75 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from .settings import settings
+from sqlalchemy.pool import NullPool
+from .settings import get_settings
 import logging
+import orjson
+import os
 
 logger = logging.getLogger(__name__)
 
-# Create the async database engine with connection pooling
+# Serverless instances are short-lived and numerous, so pooled connections would only pile up on Neon
+IS_SERVERLESS = os.getenv("VERCEL") == "1" or os.getenv("ENVIRONMENT", "").lower() in ("vercel", "serverless")
+
+def _json_serializer(value) -> str:
+    return orjson.dumps(value).decode()
+
+
+engine_options = {
+    "echo": False,  # Set to True to log SQL queries for debugging
+    "json_serializer": _json_serializer,  # JSON/JSONB columns are encoded with orjson
+    "json_deserializer": orjson.loads,
+}
+
+if IS_SERVERLESS:
+    engine_options["poolclass"] = NullPool
+else:
+    engine_options.update(
+        pool_size=5,  # Number of connection objects to maintain
+        max_overflow=5,  # Number of connections that can be created beyond pool_size
+        pool_recycle=300,  # Recycle connections after 5 minutes, before Neon drops them when idle
+        pool_timeout=30  # Time in seconds to wait for a connection from the pool
+    )
+
+DATABASE_URL = get_settings().NEON_DATABASE_URL
+
+if DATABASE_URL.startswith("postgresql+asyncpg"):
+    # Neon's PgBouncer pooler can't keep prepared statements, and JIT only slows these short queries
+    engine_options["connect_args"] = {"server_settings": {"jit": "off"}, "statement_cache_size": 0}
+
+# Create the async database engine
 engine = create_async_engine(
-    settings.NEON_DATABASE_URL,  # Using NEON_DATABASE_URL as defined in settings
-    pool_size=20,  # Number of connection objects to maintain
-    max_overflow=30,  # Number of connections that can be created beyond pool_size
-    pool_pre_ping=True,  # Verify connections are alive before using them
-    pool_recycle=300,  # Recycle connections after 5 minutes
-    echo=False,  # Set to True to log SQL queries for debugging
-    pool_timeout=30  # Time in seconds to wait for a connection from the pool
+    DATABASE_URL,  # Using NEON_DATABASE_URL as defined in settings
+    **engine_options
 )
 
 # Create a configured "AsyncSession" class
 AsyncSessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
+    expire_on_commit=False,  # Objects stay readable after commit without another SELECT (which async sessions can't lazily issue)
     bind=engine,
     class_=AsyncSession  # Specify that this should create AsyncSession instances
 )
 
+def create_isolated_session_factory():
+    """
+    Session factory on its own unpooled engine, for code running on a separate event loop
+    (e.g. ingest under asyncio.run in a worker thread). asyncpg connections are bound to the
+    loop that opened them, so that code must not borrow connections from the app's pool.
+    """
+    isolated_engine = create_async_engine(
+        DATABASE_URL,
+        echo=False,
+        poolclass=NullPool,
+        json_serializer=_json_serializer,
+        json_deserializer=orjson.loads,
+        connect_args=engine_options.get("connect_args", {})
+    )
+    return sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=isolated_engine, class_=AsyncSession)
+
+
 # Create a Base class for declarative models
 Base = declarative_base()
 
@@ -45,7 +90,7 @@ async def init_db():
         # Import all models to ensure they're registered with Base.metadata
         from ..models.chat_models import Question, Answer, RetrievedContext
         from ..models.log_models import LogEntry
-        from ..models.embedding_models import BookContentChunk, EmbeddingJob
+        from ..models.embedding_models import BookContentChunk, EmbeddingJob, EmbeddingCacheEntry
 
         # Create all tables using async engine
         async with engine.begin() as conn:
@@ -1,13 +1,20 @@
+import atexit
 import logging
+import queue
 import sys
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 
+# Background listener that writes queued records to the console and log file
+_queue_listener = None
+
 
 def setup_logging(log_level: str = "INFO", log_file: str = "app.log"):
     """
-    Setup logging configuration for the application
+    Setup logging configuration for the application.
+    Loggers only enqueue records; a background thread does the console and file I/O.
     """
+    global _queue_listener
     # Create logs directory if it doesn't exist
     logs_dir = Path("logs")
     logs_dir.mkdir(exist_ok=True)
@@ -20,6 +27,10 @@ def setup_logging(log_level: str = "INFO", log_file: str = "app.log"):
     for handler in root_logger.handlers[:]:
         root_logger.removeHandler(handler)
 
+    # Flush and stop the listener from a previous setup
+    if _queue_listener is not None:
+        _queue_listener.stop()
+
     # Create formatter
     formatter = logging.Formatter(
         '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -39,9 +50,11 @@ def setup_logging(log_level: str = "INFO", log_file: str = "app.log"):
     file_handler.setLevel(getattr(logging, log_level.upper()))
     file_handler.setFormatter(formatter)
 
-    # Add handlers to root logger
-    root_logger.addHandler(console_handler)
-    root_logger.addHandler(file_handler)
+    # Route root logger records through a queue to the handlers
+    log_queue = queue.Queue(-1)
+    root_logger.addHandler(QueueHandler(log_queue))
+    _queue_listener = QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+    _queue_listener.start()
 
     # Set specific log levels for different loggers
     logging.getLogger("uvicorn").setLevel(logging.WARNING)
@@ -51,5 +64,15 @@ def setup_logging(log_level: str = "INFO", log_file: str = "app.log"):
     logging.getLogger("openai").setLevel(logging.INFO)
 
 
-# Setup default logging
-setup_logging()
\ No newline at end of file
+def stop_logging():
+    """
+    Flush queued log records and stop the background listener
+    """
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
+# Flush pending records on interpreter exit
+atexit.register(stop_logging)
\ No newline at end of file
@@ -1,8 +1,7 @@
 from pydantic_settings import BaseSettings
 from typing import Optional
 from cohere import Client as CohereClient
-from google.generativeai import configure as configure_genai
-import google.generativeai as genai
+import functools
 
 
 class Settings(BaseSettings):
@@ -15,6 +14,8 @@ class Settings(BaseSettings):
     # Qdrant settings
     QDRANT_URL: str
     QDRANT_API_KEY: Optional[str] = None
+    QDRANT_PREFER_GRPC: bool = True  # Binary protobuf vectors over gRPC; set false to fall back to HTTP/JSON
+    QDRANT_GRPC_PORT: int = 6334
 
     # Neon Postgres settings
     NEON_DATABASE_URL: str
@@ -38,16 +39,31 @@ class Settings(BaseSettings):
         env_file = ".env"
         case_sensitive = True
 
-    @property
+    @functools.cached_property
     def cohere_client(self) -> CohereClient:
-        """Create and return a Cohere client instance"""
+        """Create (once) and return a Cohere client instance"""
         return CohereClient(api_key=self.COHERE_API_KEY)
 
-    @property
+    @functools.cached_property
     def gemini_client(self):
-        """Configure and return Gemini client"""
-        configure_genai(api_key=self.GEMINI_API_KEY)
+        """Configure (once) and return Gemini client"""
+        import google.generativeai as genai
+
+        genai.configure(api_key=self.GEMINI_API_KEY)
         return genai
 
 
-settings = Settings()
\ No newline at end of file
+@functools.lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Get the settings instance, loading it on first use
+    This defers reading .env and validating the environment until settings are needed
+    """
+    return Settings()
+
+
+# For backward compatibility, expose as an attribute that loads on first access
+def __getattr__(name):
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
\ No newline at end of file
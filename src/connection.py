@@ -3,28 +3,51 @@ Connection configuration for the Book RAG Chatbot
 Handles connections to Gemini 2.5 Flash external provider, embedding client, and Qdrant
 """
 import os
+import asyncio
+import httpx
 from dotenv import load_dotenv
 
 # Load environment variables before any settings are accessed
 load_dotenv()
 
 from typing import Optional, List, Dict, Any
-import google.generativeai as genai
-from google.generativeai import configure as configure_genai
-from .qdrant_rest import QdrantRestClient
-from cohere import Client as CohereClient
+from .qdrant_rest import QdrantRestClient, AsyncQdrantRestClient
+from cohere import Client as CohereClient, AsyncClient as AsyncCohereClient
 import cohere
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+def _format_hit(point: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a Qdrant REST point into the result format used by the agent
+    """
+    payload = point['payload']
+    return {
+        'id': point['id'],
+        'content': payload.get('content', ''),
+        'file_path': payload.get('file_path', ''),
+        'section': payload.get('section', ''),
+        'relevance_score': point['score'],
+        'metadata': payload
+    }
+
+# Connection pool limits for the shared HTTP clients (Cohere and Qdrant)
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=40, keepalive_expiry=30.0)
+HTTP_TIMEOUT = 30.0
+COHERE_EMBED_BATCH_SIZE = 96  # Most texts Cohere accepts in one embed request
+
 class ConnectionManager:
     def __init__(self):
-        # Configure Gemini client
+        # Configure Gemini client (imported here so the gRPC/protobuf stack loads only when needed)
         self.gemini_api_key = os.getenv("GEMINI_API_KEY")
         if not self.gemini_api_key:
             raise ValueError("GEMINI_API_KEY environment variable is required")
 
+        import google.generativeai as genai
+        from google.generativeai import configure as configure_genai
+
         configure_genai(api_key=self.gemini_api_key)
         self.gemini_client = genai
         self.chat_model = genai.GenerativeModel('gemini-2.5-flash')
@@ -34,7 +57,12 @@ class ConnectionManager:
         if not self.cohere_api_key:
             raise ValueError("COHERE_API_KEY environment variable is required")
 
-        self.cohere_client = CohereClient(api_key=self.cohere_api_key)
+        # Pooled HTTP/2 clients shared by Cohere and Qdrant, so requests reuse warm connections
+        self.http_client = httpx.Client(http2=True, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+        self.async_http_client = httpx.AsyncClient(http2=True, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+
+        self.cohere_client = CohereClient(api_key=self.cohere_api_key, httpx_client=self.http_client)
+        self.async_cohere_client = AsyncCohereClient(api_key=self.cohere_api_key, httpx_client=self.async_http_client)
 
         # Configure Qdrant client
         self.qdrant_url = os.getenv("QDRANT_URL")
@@ -45,7 +73,13 @@ class ConnectionManager:
 
         self.qdrant_client = QdrantRestClient(
             url=self.qdrant_url,
-            api_key=self.qdrant_api_key
+            api_key=self.qdrant_api_key,
+            http_client=self.http_client
+        )
+        self.async_qdrant_client = AsyncQdrantRestClient(
+            url=self.qdrant_url,
+            api_key=self.qdrant_api_key,
+            http_client=self.async_http_client
         )
 
         # Collection name for book content
@@ -53,12 +87,31 @@ class ConnectionManager:
 
     def embed(self, texts: List[str]) -> List[List[float]]:
         """
-        Generate embeddings for the provided texts using Cohere
+        Generate embeddings for the provided texts using Cohere,
+        sending up to COHERE_EMBED_BATCH_SIZE texts per request
+        """
+        try:
+            embeddings = []
+            for start in range(0, len(texts), COHERE_EMBED_BATCH_SIZE):
+                response = self.cohere_client.embed(
+                    texts=texts[start:start + COHERE_EMBED_BATCH_SIZE],
+                    model="embed-multilingual-v3.0",  # Using Cohere's multilingual embedding model
+                    input_type="search_document"
+                )
+                embeddings.extend(response.embeddings)
+            return embeddings
+        except Exception as e:
+            logger.error(f"Error generating embeddings: {str(e)}")
+            raise
+
+    async def embed_async(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generate embeddings for the provided texts using Cohere, without blocking the event loop
         """
         try:
-            response = self.cohere_client.embed(
+            response = await self.async_cohere_client.embed(
                 texts=texts,
-                model="embed-multilingual-v3.0",  # Using Cohere's multilingual embedding model
+                model="embed-multilingual-v3.0",
                 input_type="search_document"
             )
             return [embedding for embedding in response.embeddings]
@@ -143,14 +196,57 @@ class ConnectionManager:
                     logger.error(f"Scroll method also failed: {str(scroll_error)}")
                     raise e  # Re-raise the original error
 
+    def qdrant_search_batch(self, query_embeddings: List[List[float]], top_k: int = 5) -> List[List[Dict[str, Any]]]:
+        """
+        Search for similar content for several query embeddings in one Qdrant request
+        """
+        try:
+            batch_result = self.qdrant_client.query_batch_points(
+                collection_name=self.collection_name,
+                queries=query_embeddings,
+                limit=top_k,
+                with_payload=True
+            )
+        except Exception as e:
+            logger.error(f"Error in batch query of Qdrant: {str(e)}")
+            # Fallback to the older batch search API for servers without the query API
+            batch_result = self.qdrant_client.search_batch(
+                collection_name=self.collection_name,
+                query_vectors=query_embeddings,
+                limit=top_k,
+                with_payload=True
+            )
+
+        return [[_format_hit(point) for point in points] for points in batch_result]
+
+    async def qdrant_search_batch_async(self, query_embeddings: List[List[float]], top_k: int = 5) -> List[List[Dict[str, Any]]]:
+        """
+        Search for similar content for several query embeddings in one Qdrant request, without blocking the event loop
+        """
+        try:
+            batch_result = await self.async_qdrant_client.query_batch_points(
+                collection_name=self.collection_name,
+                queries=query_embeddings,
+                limit=top_k,
+                with_payload=True
+            )
+        except Exception as e:
+            logger.error(f"Error in batch query of Qdrant: {str(e)}")
+            # Fallback to the older batch search API for servers without the query API
+            batch_result = await self.async_qdrant_client.search_batch(
+                collection_name=self.collection_name,
+                query_vectors=query_embeddings,
+                limit=top_k,
+                with_payload=True
+            )
+
+        return [[_format_hit(point) for point in points] for points in batch_result]
+
     def selected_text_search(self, selected_text: str) -> List[Dict[str, Any]]:
         """
         Create a result from selected text (for selected-text QA mode)
         """
         try:
-            # Generate embedding for the selected text
-            embeddings = self.embed([selected_text])
-
             # Return the selected text as a single result
             result = {
                 'id': 'selected_text',
@@ -166,6 +262,77 @@ class ConnectionManager:
             logger.error(f"Error processing selected text: {str(e)}")
             raise
 
+class QdrantSearchBatcher:
+    """
+    Coalesces concurrent Qdrant searches into batch requests.
+    Searches queued within `max_wait` seconds of each other (up to `max_batch_size` of them)
+    are sent to Qdrant as a single batch call. Batches are sent with the async Qdrant client,
+    so batches in flight overlap on the event loop.
+    """
+
+    def __init__(self, max_batch_size: int = 16, max_wait: float = 0.008, max_queue_size: int = 1024):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue_size = max_queue_size
+        self._loop = None
+        self._queue = None
+        self._worker = None
+        self._dispatches = set()  # Batches in flight; the loop only keeps weak references to tasks
+
+    async def search(self, query_embedding: List[float], top_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Queue a search and wait for the batch it lands in to complete
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            # Queues and tasks are bound to a loop, so (re)start the worker on the current one
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._worker = loop.create_task(self._collect())
+
+        future = loop.create_future()
+        await self._queue.put((query_embedding, top_k, future))
+        return await future
+
+    async def _collect(self):
+        """
+        Gather queued searches into batches and dispatch each batch without blocking collection
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            task = loop.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch):
+        """
+        Run one batch search and resolve each caller's future with its own results
+        """
+        embeddings = [embedding for embedding, _, _ in batch]
+        top_k = max(limit for _, limit, _ in batch)
+        try:
+            results = await get_connection_manager().qdrant_search_batch_async(embeddings, top_k)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, limit, future), hits in zip(batch, results):
+            if not future.done():
+                future.set_result(hits[:limit])
+
+
 # Global instance with lazy initialization
 _connection_manager = None
 
@@ -181,6 +348,10 @@ def get_connection_manager():
     return _connection_manager
 
 
+# Shared search batcher for async callers
+search_batcher = QdrantSearchBatcher()
+
+
 # For backward compatibility, expose as a property that initializes on first access
 def __getattr__(name):
     if name == "connection_manager":
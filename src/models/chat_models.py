@@ -1,10 +1,9 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Float, ForeignKey
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, Integer, String, DateTime, Text, Float, ForeignKey, JSON
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
-
-Base = declarative_base()
+from ..config.database import Base  # Shared so relationships and foreign keys resolve across model modules
 
 
 class Question(Base):
@@ -39,7 +38,7 @@ class Answer(Base):
     content = Column(Text, nullable=False)  # The text content of the answer
     timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)  # When the answer was generated
     session_id = Column(String, nullable=True)  # Identifier for the conversation session
-    source_chunks = Column(String, nullable=True)  # References to the chunks that informed the answer (JSON string)
+    source_chunks = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)  # References to the chunks that informed the answer (JSONB on Postgres)
     confidence_score = Column(Float, nullable=True)  # Agent's confidence in the answer
 
     # Relationship to Question
@@ -1,9 +1,7 @@
 from sqlalchemy import Column, Integer, String, DateTime, Text, Float
-from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 import uuid
-
-Base = declarative_base()
+from ..config.database import Base  # Shared so relationships and foreign keys resolve across model modules
 
 
 class BookContentChunk(Base):
@@ -43,4 +41,19 @@ class EmbeddingJob(Base):
     error_message = Column(Text, nullable=True)  # Error details if job failed
 
     def __repr__(self):
-        return f"<EmbeddingJob(id={self.id}, status={self.status})>"
\ No newline at end of file
+        return f"<EmbeddingJob(id={self.id}, status={self.status})>"
+
+
+class EmbeddingCacheEntry(Base):
+    """
+    Entity: Embedding Cache Entry
+    Description: Embedding previously generated for a chunk, keyed by a hash of the model and chunk content
+    """
+    __tablename__ = "embedding_cache"
+
+    content_hash = Column(String(32), primary_key=True)  # blake2b (16-byte) hex digest of model + content
+    vector = Column(Text, nullable=False)  # The embedding (stored as JSON string)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # When the embedding was generated
+
+    def __repr__(self):
+        return f"<EmbeddingCacheEntry(content_hash={self.content_hash})>"
\ No newline at end of file
@@ -2,20 +2,58 @@
 Lightweight Qdrant REST API client to avoid heavy grpcio and numpy dependencies
 """
 import httpx
+import orjson
+from collections import namedtuple
 from typing import List, Dict, Any, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Connection pool limits for clients created by QdrantRestClient itself
+DEFAULT_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=40, keepalive_expiry=30.0)
+
+# Lets callers pass vectors as numpy arrays; orjson encodes them natively without importing numpy
+JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY
+
+# Hit returned by the legacy search() method, with qdrant-client style attribute access
+SearchResult = namedtuple("SearchResult", ["id", "score", "payload"])
+
+
+def _format_points(points: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Format raw Qdrant points to match qdrant-client structure"""
+    return [
+        {
+            "id": point.get("id"),
+            "score": point.get("score", 0),
+            "payload": point.get("payload", {})
+        }
+        for point in points
+    ]
+
 
 class QdrantRestClient:
     """Lightweight Qdrant client using REST API only"""
 
-    def __init__(self, url: str, api_key: Optional[str] = None):
+    def __init__(self, url: str, api_key: Optional[str] = None, http_client: Optional[httpx.Client] = None):
         self.url = url.rstrip('/')
+        # Bodies are serialized with orjson and sent as raw content, so the type is set here
         self.headers = {"Content-Type": "application/json"}
         if api_key:
             self.headers["api-key"] = api_key
+        # Reuse pooled keep-alive connections instead of a new TCP/TLS handshake per request
+        self._owns_client = http_client is None
+        self.http_client = http_client or httpx.Client(timeout=30.0, limits=DEFAULT_LIMITS, http2=True)
+
+    def close(self):
+        """Close the HTTP client if this instance created it"""
+        if self._owns_client:
+            self.http_client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def query_points(
         self,
@@ -34,31 +72,50 @@ class QdrantRestClient:
         }
 
         try:
-            response = httpx.post(endpoint, json=payload, headers=self.headers, timeout=30.0)
+            response = self.http_client.post(endpoint, content=orjson.dumps(payload, option=JSON_OPTIONS), headers=self.headers, timeout=30.0)
             response.raise_for_status()
-            result = response.json()
+            result = orjson.loads(response.content)
 
             # Format response to match qdrant-client structure
-            points = []
-            for point in result.get("result", {}).get("points", []):
-                points.append({
-                    "id": point.get("id"),
-                    "score": point.get("score", 0),
-                    "payload": point.get("payload", {})
-                })
-
-            return {"points": points}
+            return {"points": _format_points(result.get("result", {}).get("points", []))}
         except Exception as e:
             logger.error(f"Qdrant query error: {e}")
             raise
 
+    def query_batch_points(
+        self,
+        collection_name: str,
+        queries: List[List[float]],
+        limit: int = 5,
+        with_payload: bool = True
+    ) -> List[List[Dict[str, Any]]]:
+        """Run several queries in a single request, returning one point list per query"""
+        endpoint = f"{self.url}/collections/{collection_name}/points/query/batch"
+
+        payload = {
+            "searches": [
+                {"query": query, "limit": limit, "with_payload": with_payload}
+                for query in queries
+            ]
+        }
+
+        try:
+            response = self.http_client.post(endpoint, content=orjson.dumps(payload, option=JSON_OPTIONS), headers=self.headers, timeout=30.0)
+            response.raise_for_status()
+            result = orjson.loads(response.content)
+
+            return [_format_points(batch.get("points", [])) for batch in result.get("result", [])]
+        except Exception as e:
+            logger.error(f"Qdrant batch query error: {e}")
+            raise
+
     def search(
         self,
         collection_name: str,
         query_vector: List[float],
         limit: int = 5,
         with_payload: bool = True
-    ) -> List[Dict[str, Any]]:
+    ) -> List[SearchResult]:
         """Legacy search method for compatibility"""
         endpoint = f"{self.url}/collections/{collection_name}/points/search"
 
@@ -69,22 +126,147 @@ class QdrantRestClient:
         }
 
         try:
-            response = httpx.post(endpoint, json=payload, headers=self.headers, timeout=30.0)
+            response = self.http_client.post(endpoint, content=orjson.dumps(payload, option=JSON_OPTIONS), headers=self.headers, timeout=30.0)
             response.raise_for_status()
-            result = response.json()
+            result = orjson.loads(response.content)
 
             # Format response
-            points = []
-            for point in result.get("result", []):
-                class SearchResult:
-                    def __init__(self, data):
-                        self.id = data.get("id")
-                        self.score = data.get("score", 0)
-                        self.payload = data.get("payload", {})
+            return [
+                SearchResult(point.get("id"), point.get("score", 0), point.get("payload", {}))
+                for point in result.get("result", [])
+            ]
+        except Exception as e:
+            logger.error(f"Qdrant search error: {e}")
+            raise
+
+    def search_batch(
+        self,
+        collection_name: str,
+        query_vectors: List[List[float]],
+        limit: int = 5,
+        with_payload: bool = True
+    ) -> List[List[Dict[str, Any]]]:
+        """Run several searches in a single request, returning one point list per query vector"""
+        endpoint = f"{self.url}/collections/{collection_name}/points/search/batch"
 
-                points.append(SearchResult(point))
+        payload = {
+            "searches": [
+                {"vector": vector, "limit": limit, "with_payload": with_payload}
+                for vector in query_vectors
+            ]
+        }
+
+        try:
+            response = self.http_client.post(endpoint, content=orjson.dumps(payload, option=JSON_OPTIONS), headers=self.headers, timeout=30.0)
+            response.raise_for_status()
+            result = orjson.loads(response.content)
 
-            return points
+            # Format response to match query_points
+            return [_format_points(points) for points in result.get("result", [])]
         except Exception as e:
-            logger.error(f"Qdrant search error: {e}")
+            logger.error(f"Qdrant batch search error: {e}")
+            raise
+
+
+class AsyncQdrantRestClient:
+    """Async counterpart of QdrantRestClient, so concurrent searches overlap instead of queueing"""
+
+    def __init__(self, url: str, api_key: Optional[str] = None, http_client: Optional[httpx.AsyncClient] = None):
+        self.url = url.rstrip('/')
+        # Bodies are serialized with orjson and sent as raw content, so the type is set here
+        self.headers = {"Content-Type": "application/json"}
+        if api_key:
+            self.headers["api-key"] = api_key
+        self._owns_client = http_client is None
+        self.http_client = http_client or httpx.AsyncClient(timeout=30.0, limits=DEFAULT_LIMITS, http2=True)
+
+    async def aclose(self):
+        """Close the HTTP client if this instance created it"""
+        if self._owns_client:
+            await self.http_client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    async def query_points(
+        self,
+        collection_name: str,
+        query: List[float],
+        limit: int = 5,
+        with_payload: bool = True
+    ) -> Dict[str, Any]:
+        """Search for similar vectors using REST API"""
+        endpoint = f"{self.url}/collections/{collection_name}/points/query"
+
+        payload = {
+            "query": query,
+            "limit": limit,
+            "with_payload": with_payload
+        }
+
+        try:
+            response = await self.http_client.post(endpoint, content=orjson.dumps(payload, option=JSON_OPTIONS), headers=self.headers, timeout=30.0)
+            response.raise_for_status()
+            result = orjson.loads(response.content)
+
+            return {"points": _format_points(result.get("result", {}).get("points", []))}
+        except Exception as e:
+            logger.error(f"Qdrant query error: {e}")
+            raise
+
+    async def query_batch_points(
+        self,
+        collection_name: str,
+        queries: List[List[float]],
+        limit: int = 5,
+        with_payload: bool = True
+    ) -> List[List[Dict[str, Any]]]:
+        """Run several queries in a single request, returning one point list per query"""
+        endpoint = f"{self.url}/collections/{collection_name}/points/query/batch"
+
+        payload = {
+            "searches": [
+                {"query": query, "limit": limit, "with_payload": with_payload}
+                for query in queries
+            ]
+        }
+
+        try:
+            response = await self.http_client.post(endpoint, content=orjson.dumps(payload, option=JSON_OPTIONS), headers=self.headers, timeout=30.0)
+            response.raise_for_status()
+            result = orjson.loads(response.content)
+
+            return [_format_points(batch.get("points", [])) for batch in result.get("result", [])]
+        except Exception as e:
+            logger.error(f"Qdrant batch query error: {e}")
+            raise
+
+    async def search_batch(
+        self,
+        collection_name: str,
+        query_vectors: List[List[float]],
+        limit: int = 5,
+        with_payload: bool = True
+    ) -> List[List[Dict[str, Any]]]:
+        """Run several searches in a single request, returning one point list per query vector"""
+        endpoint = f"{self.url}/collections/{collection_name}/points/search/batch"
+
+        payload = {
+            "searches": [
+                {"vector": vector, "limit": limit, "with_payload": with_payload}
+                for vector in query_vectors
+            ]
+        }
+
+        try:
+            response = await self.http_client.post(endpoint, content=orjson.dumps(payload, option=JSON_OPTIONS), headers=self.headers, timeout=30.0)
+            response.raise_for_status()
+            result = orjson.loads(response.content)
+
+            return [_format_points(points) for points in result.get("result", [])]
+        except Exception as e:
+            logger.error(f"Qdrant batch search error: {e}")
             raise
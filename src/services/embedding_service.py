@@ -1,17 +1,29 @@
 from typing import List, Dict, Any, Optional
-from ..config.settings import settings
+from ..config.settings import get_settings
 from ..services.qdrant_service import qdrant_service
 from ..services.postgres_service import postgres_service
+from ..config.database import create_isolated_session_factory
 from ..utils.document_parser import document_parser
 from ..utils.text_chunker import text_chunker
-import cohere
+from cohere import AsyncClient as AsyncCohereClient
+import httpx
+import hashlib
 import logging
 import os
+import uuid
 import asyncio
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+EMBED_BATCH_SIZE = 96  # Cohere's recommended batch size
+EMBED_CONCURRENCY = 20  # Cohere embed requests in flight at once during ingest (well under the 10K/min limit)
+MAX_PENDING_BATCHES = EMBED_CONCURRENCY * 2  # Batches chunked ahead of Cohere, bounding ingest memory
+UPSERT_WORKERS = 4  # Threads running Qdrant upserts while further Cohere requests are in flight
+POINT_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "book_content")  # Namespace for deterministic chunk point IDs
+
 
 class EmbeddingService:
     """
@@ -19,90 +31,90 @@ class EmbeddingService:
     """
 
     def __init__(self):
-        self.cohere_client = settings.cohere_client
+        self.cohere_client = get_settings().cohere_client
         self.qdrant_service = qdrant_service
         self.postgres_service = postgres_service
+        self._background_tasks = set()  # Embedding jobs started by process_directory_async
+        # Kept across ingest runs; asyncio.run's default executor is torn down after every run
+        self._upsert_pool = ThreadPoolExecutor(max_workers=UPSERT_WORKERS, thread_name_prefix="qdrant-upsert")
 
     def generate_embeddings_for_documents(self, documents: List[Dict[str, Any]]) -> bool:
         """
-        Generate embeddings for a list of documents and store them in Qdrant
+        Generate embeddings for a list of documents and store them in Qdrant.
+        Runs the async pipeline to completion, so call it from a worker thread rather than an event loop.
+        """
+        return asyncio.run(self.generate_embeddings_for_documents_async(documents))
+
+    async def generate_embeddings_for_documents_async(self, documents: List[Dict[str, Any]]) -> bool:
+        """
+        Generate embeddings for a list of documents and store them in Qdrant,
+        with up to EMBED_CONCURRENCY Cohere batches in flight at once.
+        Chunks whose content was embedded before reuse the cached embedding instead of calling Cohere.
         """
         try:
-            # Create the collection if it doesn't exist
-            self.qdrant_service.create_collection()
-
-            for i, doc in enumerate(documents):
-                logger.info(f"Processing document {i+1}/{len(documents)}: {doc['file_path']}")
-
-                # Chunk the document content
-                chunks = text_chunker.chunk_markdown(doc["content"], {
-                    "file_path": doc["file_path"],
-                    "title": doc["title"],
-                    "sections": doc["sections"],
-                    "chapter": doc["chapter"]
-                })
+            # Create the collection if it doesn't exist; a new one is bulk loaded with indexing deferred
+            self.qdrant_service.create_collection(bulk=True)
 
-                # Process chunks in batches for efficiency
-                batch_size = 96  # Cohere's recommended batch size
-                for j in range(0, len(chunks), batch_size):
-                    batch_chunks = chunks[j:j + batch_size]
-
-                    # Extract content from batch chunks
-                    batch_contents = [chunk_data["content"] for chunk_data in batch_chunks]
-
-                    # Validate chunks before sending to Cohere
-                    valid_contents = []
-                    valid_indices = []
-
-                    for idx, chunk_data in enumerate(batch_chunks):
-                        content = chunk_data["content"]
-                        is_valid, error_msg = text_chunker.validate_chunk(content)
-                        if is_valid:
-                            valid_contents.append(content)
-                            valid_indices.append(idx)
-                        else:
-                            logger.warning(f"Skipping invalid chunk: {error_msg}")
-
-                    if not valid_contents:
-                        continue
-
-                    # Generate embeddings using Cohere
-                    try:
-                        response = self.cohere_client.embed(
-                            texts=valid_contents,
-                            model=settings.EMBEDDING_MODEL,  # e.g., "embed-multilingual-v3.0"
-                            input_type="search_document"
+            try:
+                semaphore = asyncio.Semaphore(EMBED_CONCURRENCY)
+                session_factory = create_isolated_session_factory()
+                # The async client is bound to this event loop, so it lives only as long as the run
+                async with httpx.AsyncClient(timeout=60.0, limits=httpx.Limits(max_connections=EMBED_CONCURRENCY)) as http_client:
+                    cohere_client = AsyncCohereClient(api_key=get_settings().COHERE_API_KEY, httpx_client=http_client)
+                    pending = set()
+
+                    for i, doc in enumerate(documents):
+                        file_path = doc["file_path"]
+                        sections = doc["sections"]
+                        logger.info(f"Processing document {i+1}/{len(documents)}: {file_path}")
+
+                        # Every chunk of a document carries the same metadata apart from its index, so build it once here
+                        doc_metadata = {
+                            "file_path": file_path,
+                            "section": sections[0] if sections else "",
+                            "chapter": doc["chapter"],
+                            "title": doc["title"],
+                        }
+
+                        # Drop the file's previous points (including ones stored under older random IDs and
+                        # chunks past the file's new end) before upserting its current chunks
+                        await asyncio.get_running_loop().run_in_executor(
+                            self._upsert_pool, self.qdrant_service.delete_file_points, file_path
                         )
 
-                        # Store embeddings in Qdrant
-                        for idx, embedding in enumerate(response.embeddings):
-                            original_idx = valid_indices[idx]
-                            chunk_data = batch_chunks[original_idx]
-                            content = chunk_data["content"]
-
-                            # Store in Qdrant - use a proper ID format (Qdrant expects UUIDs or integers)
-                            import uuid
-                            chunk_id = str(uuid.uuid4())  # Generate a unique UUID for each chunk
-                            metadata = {
-                                "file_path": doc["file_path"],
-                                "section": chunk_data["metadata"].get("sections", [""])[0] if chunk_data["metadata"].get("sections") else "",
-                                "chapter": chunk_data["metadata"].get("chapter", ""),
-                                "chunk_index": j + original_idx,
-                                "title": chunk_data["metadata"].get("title", ""),
-                            }
-
-                            success = self.qdrant_service.store_embedding(
-                                chunk_id=chunk_id,
-                                content=content,
-                                embedding=embedding,
-                                metadata=metadata
-                            )
-
-                            if not success:
-                                logger.error(f"Failed to store embedding for chunk {chunk_id}")
-                    except Exception as e:
-                        logger.error(f"Error generating embeddings for batch: {str(e)}")
-                        continue
+                        # Chunk the document content lazily and pull one Cohere batch at a time
+                        chunk_iter = text_chunker.iter_chunk_markdown(doc["content"])
+                        while batch_chunks := list(islice(chunk_iter, EMBED_BATCH_SIZE)):
+                            # Validate chunks before sending to Cohere
+                            valid_contents = []
+                            chunk_indices = []
+
+                            for chunk_data in batch_chunks:
+                                content = chunk_data["content"]
+                                is_valid, error_msg = text_chunker.validate_chunk(content)
+                                if is_valid:
+                                    valid_contents.append(content)
+                                    chunk_indices.append(chunk_data["chunk_index"])
+                                else:
+                                    logger.warning(f"Skipping invalid chunk: {error_msg}")
+
+                            if not valid_contents:
+                                continue
+
+                            # Cap the batches held in memory; wait for one to finish before chunking further
+                            if len(pending) >= MAX_PENDING_BATCHES:
+                                _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+                            pending.add(asyncio.create_task(self._embed_and_store_batch(
+                                cohere_client, semaphore, session_factory, doc_metadata, valid_contents, chunk_indices
+                            )))
+
+                    # Failed batches are logged and skipped inside each task
+                    if pending:
+                        await asyncio.wait(pending)
+            finally:
+                # Build the HNSW index once now that the initial upload is in, even if some of it failed
+                self.qdrant_service.finalize_bulk_load()
 
             logger.info("Embedding generation completed successfully")
             return True
@@ -110,114 +122,218 @@ class EmbeddingService:
             logger.error(f"Error in embedding generation: {str(e)}")
             return False
 
-    def process_directory(self, directory_path: str, job_id: Optional[str] = None) -> bool:
+    async def _embed_and_store_batch(self,
+                                     cohere_client: AsyncCohereClient,
+                                     semaphore: asyncio.Semaphore,
+                                     session_factory,
+                                     doc_metadata: Dict[str, Any],
+                                     valid_contents: List[str],
+                                     chunk_indices: List[int]):
         """
-        Process all markdown files in a directory and generate embeddings
+        Embed one batch of chunks with Cohere and upsert the points to Qdrant.
+        Only chunks missing from the embedding cache are sent to Cohere.
         """
         try:
-            # Parse all markdown files in the directory
-            documents = document_parser.parse_directory(directory_path)
+            model = get_settings().EMBEDDING_MODEL  # e.g., "embed-multilingual-v3.0"
+            content_hashes = [self._content_hash(model, content) for content in valid_contents]
 
-            if not documents:
-                logger.warning(f"No markdown documents found in {directory_path}")
-                if job_id:
-                    self.postgres_service.update_embedding_job(
-                        job_id,
-                        status="failed",
-                        error_message="No markdown documents found in directory"
+            try:
+                cached = await self.postgres_service.get_cached_embeddings(content_hashes, session_factory)
+            except Exception as e:
+                logger.warning(f"Embedding cache lookup failed, embedding the whole batch: {str(e)}")
+                cached = {}
+
+            embeddings = [cached.get(content_hash) for content_hash in content_hashes]
+            misses = [idx for idx, embedding in enumerate(embeddings) if embedding is None]
+
+            if misses:
+                # Generate embeddings using Cohere
+                async with semaphore:
+                    response = await cohere_client.embed(
+                        texts=[valid_contents[idx] for idx in misses],
+                        model=model,
+                        input_type="search_document"
                     )
-                return False
 
-            logger.info(f"Found {len(documents)} documents to process")
+                new_embeddings = {}
+                for idx, embedding in zip(misses, response.embeddings):
+                    embeddings[idx] = embedding
+                    new_embeddings[content_hashes[idx]] = embedding
+
+                try:
+                    await self.postgres_service.store_cached_embeddings(new_embeddings, session_factory)
+                except Exception as e:
+                    logger.warning(f"Failed to save {len(new_embeddings)} embeddings to the cache: {str(e)}")
+
+            # Collect the batch's points so they're stored in Qdrant with a single upsert
+            entries = []
+            for idx, embedding in enumerate(embeddings):
+                # Deterministic ID, so re-ingesting a file overwrites its chunks instead of duplicating them
+                entries.append({
+                    "chunk_id": self._point_id(doc_metadata["file_path"], chunk_indices[idx]),
+                    "content": valid_contents[idx],
+                    "embedding": embedding,
+                    "metadata": {**doc_metadata, "chunk_index": chunk_indices[idx]}
+                })
+
+            # The Qdrant service is synchronous; run the upsert on the upsert pool so other batches keep embedding
+            stored = await asyncio.get_running_loop().run_in_executor(
+                self._upsert_pool, self.qdrant_service.store_embeddings_batch, entries
+            )
+            if not stored:
+                logger.error(f"Failed to store embeddings for batch of {len(entries)} chunks")
+        except Exception as e:
+            logger.error(f"Error generating embeddings for batch: {str(e)}")
 
-            # Create embedding job record if not provided
-            if not job_id:
-                job_id = self.postgres_service.create_embedding_job(len(documents), "processing")
-                logger.info(f"Created embedding job: {job_id}")
+    @staticmethod
+    def _point_id(file_path: str, chunk_index: int) -> int:
+        """
+        Qdrant point ID for a chunk: a 63-bit integer derived from its file and position
+        """
+        return uuid.uuid5(POINT_ID_NAMESPACE, f"{file_path}:{chunk_index}").int & ((1 << 63) - 1)
 
-            # Update job status as processing
-            self.postgres_service.update_embedding_job(job_id, status="processing")
+    @staticmethod
+    def _content_hash(model: str, content: str) -> str:
+        """
+        Embedding cache key for a chunk; includes the model so switching models doesn't reuse stale vectors
+        """
+        return hashlib.blake2b(f"{model}\0{content}".encode("utf-8"), digest_size=16).hexdigest()
 
-            try:
-                # Generate embeddings for all documents
-                success = self.generate_embeddings_for_documents(documents)
+    def process_directory(self,
+                          directory_path: str,
+                          job_id: Optional[str] = None,
+                          documents: Optional[List[Dict[str, Any]]] = None) -> bool:
+        """
+        Process all markdown files in a directory and generate embeddings, recording progress on an embedding job.
+        Pass documents when the directory has already been parsed to skip parsing it again.
+        Runs to completion, so call it from a worker thread rather than an event loop.
+        """
+        try:
+            # Parse all markdown files in the directory
+            if documents is None:
+                documents = document_parser.parse_directory(directory_path)
 
-                # Update job status based on result
-                final_status = "completed" if success else "failed"
-                self.postgres_service.update_embedding_job(
-                    job_id,
-                    status=final_status,
-                    processed_files=len(documents),
-                    total_embeddings=self.qdrant_service.get_embedding_count(),
-                    end_time=datetime.utcnow()
-                )
+            if documents:
+                logger.info(f"Found {len(documents)} documents to process")
+            else:
+                logger.warning(f"No markdown documents found in {directory_path}")
 
-                return success
-            except Exception as e:
-                # Update job status to failed
-                self.postgres_service.update_embedding_job(
-                    job_id,
-                    status="failed",
-                    error_message=str(e),
-                    end_time=datetime.utcnow()
-                )
-                raise e
+            return asyncio.run(self._process_documents(documents, job_id))
         except Exception as e:
             logger.error(f"Error processing directory {directory_path}: {str(e)}")
-            if job_id:
-                self.postgres_service.update_embedding_job(
-                    job_id,
-                    status="failed",
-                    error_message=str(e),
-                    end_time=datetime.utcnow()
-                )
             return False
 
-    def process_directory_async(self, directory_path: str) -> str:
+    async def _process_documents(self, documents: List[Dict[str, Any]], job_id: Optional[str]) -> bool:
+        """
+        Embed parsed documents under an embedding job, creating the job record if needed
+        """
+        # This runs under its own asyncio.run, so job rows go through an unpooled engine
+        session_factory = create_isolated_session_factory()
+
+        if not job_id:
+            job_id = await self.postgres_service.create_embedding_job(
+                len(documents), "processing", session_factory=session_factory
+            )
+            logger.info(f"Created embedding job: {job_id}")
+
+        return await self._run_embedding_job(job_id, documents, session_factory)
+
+    async def process_directory_async(self, directory_path: str) -> str:
         """
-        Process directory asynchronously and return job ID
+        Start processing a directory in the background and return the job ID.
+        The directory is parsed once here and the documents are handed to the background job.
         """
+        documents = await asyncio.to_thread(document_parser.parse_directory, directory_path)
+
         # Create embedding job record
-        job_id = self.postgres_service.create_embedding_job(
-            total_files=len(document_parser.parse_directory(directory_path)),
+        job_id = await self.postgres_service.create_embedding_job(
+            total_files=len(documents),
             status="pending"
         )
 
-        # Update to processing and start async processing
-        self.postgres_service.update_embedding_job(job_id, status="processing")
-
-        # In a real implementation, we would use a task queue like Celery
-        # For now, we'll simulate async processing by calling the sync method in a thread
-        import threading
-        thread = threading.Thread(
-            target=self.process_directory,
-            args=(directory_path, job_id)
-        )
-        thread.start()
+        # Run the job on the event loop; the blocking embedding work goes to a worker thread.
+        # Keep a reference so the task isn't garbage collected before it finishes.
+        task = asyncio.create_task(self._run_embedding_job(job_id, documents))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
 
         return job_id
 
+    async def _run_embedding_job(self, job_id: str, documents: List[Dict[str, Any]], session_factory=None) -> bool:
+        """
+        Generate embeddings for already parsed documents, recording progress on the job.
+        Returns whether embedding succeeded.
+        """
+        try:
+            if not documents:
+                await self.postgres_service.update_embedding_job(
+                    job_id,
+                    status="failed",
+                    error_message="No markdown documents found in directory",
+                    session_factory=session_factory
+                )
+                return False
+
+            await self.postgres_service.update_embedding_job(job_id, status="processing", session_factory=session_factory)
+
+            success = await asyncio.to_thread(self.generate_embeddings_for_documents, documents)
+
+            await self.postgres_service.update_embedding_job(
+                job_id,
+                status="completed" if success else "failed",
+                processed_files=len(documents),
+                total_embeddings=await asyncio.to_thread(self.qdrant_service.get_embedding_count),
+                end_time=datetime.utcnow(),
+                session_factory=session_factory
+            )
+            return success
+        except Exception as e:
+            logger.error(f"Error in embedding job {job_id}: {str(e)}")
+            try:
+                await self.postgres_service.update_embedding_job(
+                    job_id,
+                    status="failed",
+                    error_message=str(e),
+                    end_time=datetime.utcnow(),
+                    session_factory=session_factory
+                )
+            except Exception as update_error:
+                logger.error(f"Failed to mark embedding job {job_id} as failed: {str(update_error)}")
+            return False
+
     def count_embeddings(self) -> int:
         """
         Get the total count of embeddings in the vector database
         """
         return self.qdrant_service.get_embedding_count()
 
-    def regenerate_embeddings(self, source_path: str, collection_name: str = "book_content") -> Dict[str, Any]:
+    def regenerate_embeddings(self,
+                              source_path: Optional[str] = None,
+                              collection_name: str = "book_content",
+                              file_paths: Optional[List[str]] = None) -> Dict[str, Any]:
         """
-        Regenerate embeddings from all MD files and push to vector database
+        Regenerate embeddings from all MD files and push to vector database.
+        When file_paths is given only those files are embedded (one batch of a larger ingest).
         """
         try:
             # Update Qdrant service collection name if needed
             self.qdrant_service.collection_name = collection_name
 
-            # Process the directory
-            success = self.process_directory(source_path)
+            if file_paths:
+                # Embed just this batch of files
+                documents = document_parser.parse_files(file_paths)
+                success = bool(documents) and self.generate_embeddings_for_documents(documents)
+                total_files = len(documents)
+            else:
+                # Parse the directory once; the same documents are embedded and counted
+                documents = document_parser.parse_directory(source_path) if os.path.exists(source_path) else []
+                success = self.process_directory(source_path, documents=documents)
+                total_files = len(documents)
 
             result = {
                 "status": "completed" if success else "failed",
                 "job_id": f"job_{int(datetime.utcnow().timestamp())}",
-                "total_files": len(document_parser.parse_directory(source_path)) if os.path.exists(source_path) else 0,
+                "total_files": total_files,
                 "message": "Embedding regeneration completed successfully" if success else "Embedding regeneration failed"
             }
 
@@ -1,10 +1,16 @@
+import threading
+import time
 import requests
-from typing import Optional, Dict, Any
-from ..config.settings import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Optional, Dict, Any, Tuple
+from ..config.settings import get_settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+DOCS_CACHE_TTL = 3600  # Seconds a fetched docs topic is reused before fetching it again
+
 
 class MCPClient:
     """
@@ -12,30 +18,49 @@ class MCPClient:
     """
 
     def __init__(self):
-        if not settings.CONTEXT7_MCP_SERVER_URL:
+        if not get_settings().CONTEXT7_MCP_SERVER_URL:
             logger.warning("Context7 MCP Server URL not configured. Documentation features may be limited.")
 
+        # One session so successive docs lookups reuse pooled keep-alive connections
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=Retry(total=3, backoff_factor=0.2))
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+        # Fetched docs by topic, as (expires_at, docs); docs rarely change within a process lifetime
+        self._docs_cache: Dict[Optional[str], Tuple[float, Dict[str, Any]]] = {}
+        self._docs_cache_lock = threading.Lock()
+
     def fetch_openai_agent_docs(self, topic: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
-        Fetch OpenAI Agent SDK documentation from Context7 MCP Server
+        Fetch OpenAI Agent SDK documentation from Context7 MCP Server.
+        Successful responses are cached per topic for DOCS_CACHE_TTL seconds.
         """
-        if not settings.context7_mcp_server_url:
+        if not get_settings().CONTEXT7_MCP_SERVER_URL:
             logger.error("Context7 MCP Server URL not configured")
             return None
 
+        with self._docs_cache_lock:
+            cached = self._docs_cache.get(topic)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+
         try:
             # This is a placeholder implementation - actual MCP protocol implementation
             # would require more specific knowledge of the Context7 server interface
-            url = f"{settings.context7_mcp_server_url}/docs/openai-agent"
+            url = f"{get_settings().CONTEXT7_MCP_SERVER_URL}/docs/openai-agent"
 
             params = {}
             if topic:
                 params["topic"] = topic
 
-            response = requests.get(url, params=params)
+            response = self._session.get(url, params=params, timeout=10)
             response.raise_for_status()
 
-            return response.json()
+            docs = response.json()
+            with self._docs_cache_lock:
+                self._docs_cache[topic] = (time.monotonic() + DOCS_CACHE_TTL, docs)
+            return docs
         except Exception as e:
             logger.error(f"Error fetching OpenAI Agent docs: {str(e)}")
             return None
@@ -1,14 +1,26 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
+from sqlalchemy.orm import contains_eager
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from typing import List, Optional, Dict, Any
 from datetime import datetime
-import json
+import uuid
+import orjson
 
 from ..models.chat_models import Question, Answer, RetrievedContext
 from ..models.log_models import LogEntry
-from ..models.embedding_models import EmbeddingJob
+from ..models.embedding_models import EmbeddingJob, EmbeddingCacheEntry
 from ..config.database import AsyncSessionLocal
 
+# Log rows with their question and answer populated from the same joined SELECT
+_LOGS_QUERY = (
+    select(LogEntry)
+    .join(LogEntry.question)
+    .join(LogEntry.answer)
+    .options(contains_eager(LogEntry.question), contains_eager(LogEntry.answer))
+)
+
 
 class PostgresService:
     """
@@ -34,39 +46,38 @@ class PostgresService:
         """
         Log a user interaction to PostgreSQL
         """
+        # IDs are generated here rather than read back after a flush, so the three rows
+        # are written in a single flush at commit instead of one round trip per row
+        question_id = str(uuid.uuid4())
+        answer_id = str(uuid.uuid4())
+
         async with AsyncSessionLocal() as db:
             try:
-                # Create Question
-                question = Question(
-                    content=question_content,
-                    session_id=session_id,
-                    source_mode=mode
-                )
-                db.add(question)
-                await db.flush()  # Get the ID without committing
-
-                # Create Answer
-                answer = Answer(
-                    question_id=question.id,
-                    content=answer_content,
-                    session_id=session_id,
-                    source_chunks=json.dumps(source_chunks) if source_chunks else None
-                )
-                db.add(answer)
-                await db.flush()  # Get the ID without committing
-
-                # Create Log Entry
-                log_entry = LogEntry(
-                    question_id=question.id,
-                    answer_id=answer.id,
-                    user_session=session_id,
-                    mode=mode,
-                    user_feedback=user_feedback
-                )
-                db.add(log_entry)
+                db.add_all([
+                    Question(
+                        id=question_id,
+                        content=question_content,
+                        session_id=session_id,
+                        source_mode=mode
+                    ),
+                    Answer(
+                        id=answer_id,
+                        question_id=question_id,
+                        content=answer_content,
+                        session_id=session_id,
+                        source_chunks=source_chunks or None
+                    ),
+                    LogEntry(
+                        question_id=question_id,
+                        answer_id=answer_id,
+                        user_session=session_id,
+                        mode=mode,
+                        user_feedback=user_feedback
+                    ),
+                ])
 
                 await db.commit()
-                return str(question.id)
+                return question_id
             except Exception as e:
                 await db.rollback()
                 raise e
@@ -80,14 +91,16 @@ class PostgresService:
         """
         async with AsyncSessionLocal() as db:
             try:
-                # Build the query using select
-                query = select(LogEntry).join(Question).join(Answer)
+                # Start from the shared query, which loads each log's question and answer without extra queries
+                query = _LOGS_QUERY
+                # Count log rows directly; question_id and answer_id are non-null FKs, so the joins can't change the total
+                count_query = select(func.count(LogEntry.id))
 
                 if mode:
                     query = query.where(LogEntry.mode == mode)
+                    count_query = count_query.where(LogEntry.mode == mode)
 
                 # Get total count for pagination
-                count_query = select(func.count()).select_from(query.subquery())
                 result = await db.execute(count_query)
                 total = result.scalar()
 
@@ -118,20 +131,24 @@ class PostgresService:
 
     async def create_embedding_job(self,
                                    total_files: int,
-                                   status: str = "pending") -> str:
+                                   status: str = "pending",
+                                   session_factory=None) -> str:
         """
         Create a new embedding job record
         """
-        async with AsyncSessionLocal() as db:
+        # Generate the ID here so it doesn't have to be read back from the database after commit
+        job_id = str(uuid.uuid4())
+
+        async with (session_factory or AsyncSessionLocal)() as db:
             try:
                 job = EmbeddingJob(
+                    id=job_id,
                     status=status,
                     total_files=total_files
                 )
                 db.add(job)
                 await db.commit()
-                await db.refresh(job)  # Refresh to get the generated ID
-                return str(job.id)
+                return job_id
             except Exception as e:
                 await db.rollback()
                 raise e
@@ -142,11 +159,12 @@ class PostgresService:
                                    processed_files: Optional[int] = None,
                                    total_embeddings: Optional[int] = None,
                                    error_message: Optional[str] = None,
-                                   end_time: Optional[datetime] = None) -> bool:
+                                   end_time: Optional[datetime] = None,
+                                   session_factory=None) -> bool:
         """
         Update an existing embedding job
         """
-        async with AsyncSessionLocal() as db:
+        async with (session_factory or AsyncSessionLocal)() as db:
             try:
                 # Use select to get the job
                 result = await db.execute(
@@ -201,6 +219,42 @@ class PostgresService:
             except Exception as e:
                 raise e
 
+    async def get_cached_embeddings(self, content_hashes: List[str], session_factory=None) -> Dict[str, List[float]]:
+        """
+        Look up previously generated embeddings by content hash, returning those found
+        """
+        async with (session_factory or AsyncSessionLocal)() as db:
+            result = await db.execute(
+                select(EmbeddingCacheEntry.content_hash, EmbeddingCacheEntry.vector)
+                .where(EmbeddingCacheEntry.content_hash.in_(content_hashes))
+            )
+            return {content_hash: orjson.loads(vector) for content_hash, vector in result.all()}
+
+    async def store_cached_embeddings(self, embeddings: Dict[str, List[float]], session_factory=None) -> bool:
+        """
+        Save newly generated embeddings keyed by content hash.
+        Hashes already cached (e.g. stored meanwhile by a concurrent batch with the same chunk) are skipped.
+        """
+        if not embeddings:
+            return True
+
+        async with (session_factory or AsyncSessionLocal)() as db:
+            try:
+                insert = sqlite_insert if db.bind.dialect.name == "sqlite" else postgresql_insert
+                await db.execute(
+                    insert(EmbeddingCacheEntry)
+                    .values([
+                        {"content_hash": content_hash, "vector": orjson.dumps(vector).decode()}
+                        for content_hash, vector in embeddings.items()
+                    ])
+                    .on_conflict_do_nothing(index_elements=["content_hash"])
+                )
+                await db.commit()
+                return True
+            except Exception as e:
+                await db.rollback()
+                raise e
+
 
 # Global instance of PostgresService
 postgres_service = PostgresService()
\ No newline at end of file
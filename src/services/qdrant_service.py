@@ -1,11 +1,68 @@
-from qdrant_client import QdrantClient
+from qdrant_client import QdrantClient, AsyncQdrantClient
 from qdrant_client.http import models
-from typing import List, Dict, Any, Optional
-from ..config.settings import settings
+from typing import Iterable, List, Dict, Any, Optional
+from ..config.settings import get_settings
+import functools
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+INDEXED_PAYLOAD_FIELDS = ("file_path", "section", "chapter")  # Keyword-indexed so filters on them don't scan
+HNSW_M = 16  # Qdrant's default graph degree, restored after a bulk load
+UPSERT_BATCH_SIZE = 128  # Points per upsert request; amortizes HTTP and WAL overhead without oversized bodies
+UPLOAD_PARALLEL = 8  # Worker processes used by bulk_upload
+UPLOAD_BATCH_SIZE = 256  # Points per request in bulk_upload
+
+# Searches scan the in-RAM int8 vectors for twice the requested hits, then rescore them with the original vectors
+SEARCH_PARAMS = models.SearchParams(
+    quantization=models.QuantizationSearchParams(rescore=True, oversampling=2.0)
+)
+
+# Searches fetch only the payload fields _format_hit returns
+SEARCH_PAYLOAD = models.PayloadSelectorInclude(include=["content", "file_path", "section", "chapter", "chunk_index"])
+
+BREAKER_FAIL_MAX = 5  # Consecutive search failures before searches are short-circuited
+BREAKER_RESET_TIMEOUT = 30  # Seconds the breaker stays open before letting a trial search through
+
+
+class _CircuitBreaker:
+    """
+    Minimal circuit breaker: after fail_max consecutive failures, allow() returns False for
+    reset_timeout seconds so callers fail fast instead of waiting on a down Qdrant.
+    After the timeout one trial call is let through; a success closes the breaker again.
+    """
+    def __init__(self, fail_max: int = BREAKER_FAIL_MAX, reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            # Half-open: let this call through and re-arm the timeout should it fail too
+            self._opened_at = time.monotonic()
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.fail_max:
+                if self._opened_at is None:
+                    logger.warning(f"Qdrant search failing; short-circuiting searches for {self.reset_timeout}s")
+                self._opened_at = time.monotonic()
+
 
 class QdrantService:
     """
@@ -16,17 +73,51 @@ class QdrantService:
         """
         Initialize the Qdrant client with configuration from settings
         """
+        settings = get_settings()
         self.client = QdrantClient(
             url=settings.QDRANT_URL,
             api_key=settings.QDRANT_API_KEY,
-            prefer_grpc=False  # Set to True in production for better performance
+            prefer_grpc=settings.QDRANT_PREFER_GRPC,  # Vectors go as binary protobuf rather than JSON text
+            grpc_port=settings.QDRANT_GRPC_PORT
         )
         self.collection_name = "book_content"
         self.vector_size = 1024  # For Cohere's embed-multilingual-v3.0 model
+        self._bulk_loading = False  # Set while a collection created with bulk=True awaits finalize_bulk_load
+        self._breaker = _CircuitBreaker()  # Shared by all search methods
 
-    def create_collection(self) -> bool:
+    @functools.cached_property
+    def aclient(self) -> AsyncQdrantClient:
         """
-        Create a collection for storing book content chunks with embeddings
+        Async client for request handlers, created on first use so it binds to the app's event loop.
+        Don't use it from code running under its own asyncio.run (e.g. ingest worker threads).
+        """
+        settings = get_settings()
+        return AsyncQdrantClient(
+            url=settings.QDRANT_URL,
+            api_key=settings.QDRANT_API_KEY,
+            prefer_grpc=settings.QDRANT_PREFER_GRPC,
+            grpc_port=settings.QDRANT_GRPC_PORT
+        )
+
+    @staticmethod
+    def _format_hit(point) -> Dict[str, Any]:
+        """Format a scored point into the chunk dict returned by the search methods"""
+        payload = point.payload or {}
+        return {
+            "id": point.id,
+            "content": payload.get("content", ""),
+            "file_path": payload.get("file_path", ""),
+            "section": payload.get("section", ""),
+            "chapter": payload.get("chapter", ""),
+            "chunk_index": payload.get("chunk_index", 0),
+            "relevance_score": getattr(point, 'score', 0)
+        }
+
+    def create_collection(self, bulk: bool = False) -> bool:
+        """
+        Create a collection for storing book content chunks with embeddings.
+        With bulk=True a newly created collection skips HNSW graph building (m=0) so the initial
+        upload only appends vectors; call finalize_bulk_load afterwards to build the index once.
         """
         try:
             # Check if collection already exists
@@ -39,14 +130,35 @@ class QdrantService:
                     collection_name=self.collection_name,
                     vectors_config=models.VectorParams(
                         size=self.vector_size,
-                        distance=models.Distance.COSINE
+                        distance=models.Distance.COSINE,
+                        on_disk=True  # Original vectors are only read to rescore; the quantized copies stay in RAM
                     ),
-                    # Add payload indexes for efficient filtering
+                    # A few large segments mean less per-segment overhead on every query
                     optimizers_config=models.OptimizersConfigDiff(
+                        default_segment_number=2,
                         memmap_threshold=20000,
                         indexing_threshold=20000,
-                    )
+                    ),
+                    # Keep int8-quantized copies of the vectors in RAM for a quarter of the memory;
+                    # searches scan those and rescore the top hits against the original vectors
+                    quantization_config=models.ScalarQuantization(
+                        scalar=models.ScalarQuantizationConfig(
+                            type=models.ScalarType.INT8,
+                            quantile=0.99,
+                            always_ram=True,
+                        )
+                    ),
+                    hnsw_config=models.HnswConfigDiff(m=0) if bulk else None
                 )
+                self._bulk_loading = bulk
+
+                # Add payload indexes for efficient filtering
+                for field_name in INDEXED_PAYLOAD_FIELDS:
+                    self.client.create_payload_index(
+                        collection_name=self.collection_name,
+                        field_name=field_name,
+                        field_schema=models.PayloadSchemaType.KEYWORD
+                    )
                 logger.info(f"Created Qdrant collection: {self.collection_name}")
                 return True
             else:
@@ -56,131 +168,237 @@ class QdrantService:
             logger.error(f"Error creating Qdrant collection: {str(e)}")
             return False
 
+    def finalize_bulk_load(self) -> bool:
+        """
+        Turn HNSW indexing on for a collection created with bulk=True, building the graph in one pass
+        """
+        if not self._bulk_loading:
+            return True
+
+        try:
+            self.client.update_collection(
+                collection_name=self.collection_name,
+                hnsw_config=models.HnswConfigDiff(m=HNSW_M),
+                optimizers_config=models.OptimizersConfigDiff(indexing_threshold=20000)
+            )
+            self._bulk_loading = False
+            logger.info(f"Enabled HNSW indexing for Qdrant collection: {self.collection_name}")
+            return True
+        except Exception as e:
+            logger.error(f"Error finalizing bulk load: {str(e)}")
+            return False
+
+    @staticmethod
+    def build_payload(content: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Point payload for a content chunk: the chunk text plus its top-level metadata fields
+        """
+        return {
+            "content": content,
+            "file_path": metadata.get("file_path", ""),
+            "section": metadata.get("section", ""),
+            "chapter": metadata.get("chapter", ""),
+            "chunk_index": metadata.get("chunk_index", 0),
+            "title": metadata.get("title", "")
+        }
+
+    def delete_file_points(self, file_path: str) -> bool:
+        """
+        Delete every point stored for a file, so re-ingesting it doesn't leave stale or duplicate chunks
+        """
+        try:
+            self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=models.FilterSelector(
+                    filter=models.Filter(
+                        must=[models.FieldCondition(key="file_path", match=models.MatchValue(value=file_path))]
+                    )
+                ),
+                wait=True  # Must be applied before the file's new points are upserted
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting points for {file_path}: {str(e)}")
+            return False
+
     def store_embedding(self,
-                       chunk_id: str,
+                       chunk_id: int,
                        content: str,
                        embedding: List[float],
                        metadata: Dict[str, Any]) -> bool:
         """
-        Store a single content chunk with its embedding in Qdrant
+        Store a single content chunk with its embedding in Qdrant.
+        Prefer store_embeddings_batch when storing many chunks.
+        """
+        return self.store_embeddings_batch([{
+            "chunk_id": chunk_id,
+            "content": content,
+            "embedding": embedding,
+            "metadata": metadata
+        }])
+
+    def store_embeddings_batch(self, entries: List[Dict[str, Any]], batch_size: int = UPSERT_BATCH_SIZE) -> bool:
+        """
+        Store many content chunks with their embeddings, upserting up to batch_size points per request.
+        Each entry has the same fields as the store_embedding arguments: chunk_id, content, embedding, metadata.
         """
         try:
-            self.client.upsert(
+            for start in range(0, len(entries), batch_size):
+                self.client.upsert(
+                    collection_name=self.collection_name,
+                    points=[
+                        models.PointStruct(
+                            id=entry["chunk_id"],
+                            vector=entry["embedding"],
+                            payload=self.build_payload(entry["content"], entry["metadata"])
+                        )
+                        for entry in entries[start:start + batch_size]
+                    ],
+                    wait=False  # Don't block ingest on indexing; Qdrant applies updates in order
+                )
+            return True
+        except Exception as e:
+            logger.error(f"Error storing embedding batch: {str(e)}")
+            return False
+
+    def bulk_upload(self,
+                    vectors: Iterable[List[float]],
+                    payloads: Iterable[Dict[str, Any]],
+                    ids: Iterable[int],
+                    parallel: int = UPLOAD_PARALLEL,
+                    batch_size: int = UPLOAD_BATCH_SIZE) -> bool:
+        """
+        Upload a whole corpus through the client's upload_collection, which streams batches
+        over `parallel` worker processes. Inputs may be lazy iterables; build payloads with
+        build_payload. For initial loads, create the collection with bulk=True first and call
+        finalize_bulk_load afterwards.
+        """
+        try:
+            self.client.upload_collection(
                 collection_name=self.collection_name,
-                points=[
-                    models.PointStruct(
-                        id=chunk_id,
-                        vector=embedding,
-                        payload={
-                            "content": content,
-                            "file_path": metadata.get("file_path", ""),
-                            "section": metadata.get("section", ""),
-                            "chapter": metadata.get("chapter", ""),
-                            "chunk_index": metadata.get("chunk_index", 0),
-                            "metadata": metadata
-                        }
-                    )
-                ]
+                vectors=vectors,
+                payload=payloads,
+                ids=ids,
+                parallel=parallel,
+                batch_size=batch_size
             )
             return True
         except Exception as e:
-            logger.error(f"Error storing embedding: {str(e)}")
+            logger.error(f"Error bulk uploading embeddings: {str(e)}")
             return False
 
     def search_similar(self,
                       query_embedding: List[float],
-                      top_k: int = 5) -> List[Dict[str, Any]]:
+                      top_k: int = 5,
+                      query_filter: Optional[models.Filter] = None) -> List[Dict[str, Any]]:
         """
-        Search for similar content chunks based on the query embedding
+        Search for similar content chunks based on the query embedding,
+        optionally restricted by a payload filter (e.g. on file_path or chapter)
         """
+        if not self._breaker.allow():
+            return []
+
         try:
-            # Use the newer Qdrant client API - don't specify 'using' since we have an unnamed vector
-            search_results = self.client.query_points(
+            response = self.client.query_points(
                 collection_name=self.collection_name,
                 query=query_embedding,
                 limit=top_k,
-                with_payload=True
-            ).points
-
-            results = []
-            for result in search_results:
-                results.append({
-                    "id": result.id,
-                    "content": result.payload.get("content", ""),
-                    "file_path": result.payload.get("file_path", ""),
-                    "section": result.payload.get("section", ""),
-                    "chapter": result.payload.get("chapter", ""),
-                    "chunk_index": result.payload.get("chunk_index", 0),
-                    "relevance_score": getattr(result, 'score', 0),  # Handle different result formats
-                    "metadata": result.payload.get("metadata", {})
-                })
-
-            return results
+                with_payload=SEARCH_PAYLOAD,
+                query_filter=query_filter,
+                search_params=SEARCH_PARAMS
+            )
         except Exception as e:
+            self._breaker.record_failure()
             logger.error(f"Error searching similar content: {str(e)}")
-            # Fallback to try the older API format if available
-            try:
-                # Try using the legacy search method without specifying vector name
-                search_results = self.client.search(
-                    collection_name=self.collection_name,
-                    query_vector=query_embedding,
-                    limit=top_k,
-                    with_payload=True,
-                    with_vectors=False
-                )
+            return []
 
-                results = []
-                for result in search_results:
-                    results.append({
-                        "id": result.id,
-                        "content": result.payload.get("content", ""),
-                        "file_path": result.payload.get("file_path", ""),
-                        "section": result.payload.get("section", ""),
-                        "chapter": result.payload.get("chapter", ""),
-                        "chunk_index": result.payload.get("chunk_index", 0),
-                        "relevance_score": result.score,
-                        "metadata": result.payload.get("metadata", {})
-                    })
-
-                return results
-            except Exception as fallback_error:
-                logger.error(f"Fallback search also failed: {str(fallback_error)}")
-
-                # Try the legacy method without the search method if it doesn't exist
-                try:
-                    # Use scroll to get points if search is not available
-                    records, next_page = self.client.scroll(
-                        collection_name=self.collection_name,
-                        limit=top_k,
-                        with_payload=True,
-                        with_vectors=False
-                    )
+        self._breaker.record_success()
+        return [self._format_hit(point) for point in response.points]
+
+    async def search_similar_async(self,
+                                   query_embedding: List[float],
+                                   top_k: int = 5,
+                                   query_filter: Optional[models.Filter] = None) -> List[Dict[str, Any]]:
+        """
+        Search for similar content chunks without blocking the event loop, so concurrent requests overlap
+        """
+        if not self._breaker.allow():
+            return []
+
+        try:
+            response = await self.aclient.query_points(
+                collection_name=self.collection_name,
+                query=query_embedding,
+                limit=top_k,
+                with_payload=SEARCH_PAYLOAD,
+                query_filter=query_filter,
+                search_params=SEARCH_PARAMS
+            )
+        except Exception as e:
+            self._breaker.record_failure()
+            logger.error(f"Error searching similar content: {str(e)}")
+            return []
+
+        self._breaker.record_success()
+        return [self._format_hit(point) for point in response.points]
+
+    def _batch_requests(self, query_embeddings: List[List[float]], top_k: int) -> List[models.QueryRequest]:
+        return [
+            models.QueryRequest(query=query_embedding, limit=top_k, with_payload=SEARCH_PAYLOAD, params=SEARCH_PARAMS)
+            for query_embedding in query_embeddings
+        ]
+
+    def search_similar_batch(self,
+                             query_embeddings: List[List[float]],
+                             top_k: int = 5) -> List[List[Dict[str, Any]]]:
+        """
+        Search for several query embeddings in one request, returning one chunk list per query
+        """
+        if not self._breaker.allow():
+            return [[] for _ in query_embeddings]
+
+        try:
+            responses = self.client.query_batch_points(
+                collection_name=self.collection_name,
+                requests=self._batch_requests(query_embeddings, top_k)
+            )
+        except Exception as e:
+            self._breaker.record_failure()
+            logger.error(f"Error batch searching similar content: {str(e)}")
+            return [[] for _ in query_embeddings]
+
+        self._breaker.record_success()
+        return [[self._format_hit(point) for point in response.points] for response in responses]
+
+    async def search_similar_batch_async(self,
+                                         query_embeddings: List[List[float]],
+                                         top_k: int = 5) -> List[List[Dict[str, Any]]]:
+        """
+        Async form of search_similar_batch
+        """
+        if not self._breaker.allow():
+            return [[] for _ in query_embeddings]
+
+        try:
+            responses = await self.aclient.query_batch_points(
+                collection_name=self.collection_name,
+                requests=self._batch_requests(query_embeddings, top_k)
+            )
+        except Exception as e:
+            self._breaker.record_failure()
+            logger.error(f"Error batch searching similar content: {str(e)}")
+            return [[] for _ in query_embeddings]
 
-                    results = []
-                    for record in records:
-                        results.append({
-                            "id": record.id,
-                            "content": record.payload.get("content", ""),
-                            "file_path": record.payload.get("file_path", ""),
-                            "section": record.payload.get("section", ""),
-                            "chapter": record.payload.get("chapter", ""),
-                            "chunk_index": record.payload.get("chunk_index", 0),
-                            "relevance_score": 0,  # No similarity score with scroll
-                            "metadata": record.payload.get("metadata", {})
-                        })
-
-                    return results
-                except Exception as scroll_error:
-                    logger.error(f"Scroll method also failed: {str(scroll_error)}")
-                    return []
+        self._breaker.record_success()
+        return [[self._format_hit(point) for point in response.points] for response in responses]
 
     def get_embedding_count(self) -> int:
         """
-        Get the total count of embeddings in the collection
+        Get the total count of embeddings in the collection.
+        Uses Qdrant's approximate count, read from index metadata rather than a full scan.
         """
         try:
-            collection_info = self.client.get_collection(self.collection_name)
-            return collection_info.points_count
+            return self.client.count(self.collection_name, exact=False).count
         except Exception as e:
             logger.error(f"Error getting embedding count: {str(e)}")
             return 0
@@ -1,16 +1,24 @@
-from typing import List, Dict, Any, Optional
-from ..config.settings import settings
+from typing import List, Dict, Any, Optional, Tuple
+from ..config.settings import get_settings
 from ..services.qdrant_service import qdrant_service
 from ..services.postgres_service import postgres_service
 from ..services.mcp_client import mcp_client
+from ..services.semantic_cache import SemanticCache, SEMANTIC_CACHE_ENABLED
 from ..utils.text_chunker import text_chunker
 import cohere
+import asyncio
+import functools
 import logging
-import json
 import time
 
 logger = logging.getLogger(__name__)
 
+CONTEXT_CACHE_THRESHOLD = 0.95  # Retrieved chunks are reused only for near-identical questions
+
+
+def _copy_context(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {**entry, "chunks": list(entry["chunks"])}
+
 
 class RAGService:
     """
@@ -18,12 +26,26 @@ class RAGService:
     """
 
     def __init__(self):
-        self.cohere_client = settings.cohere_client
+        self.cohere_client = get_settings().cohere_client
         self.qdrant_service = qdrant_service
         self.postgres_service = postgres_service
         self.mcp_client = mcp_client
+        # Retrieval results by query embedding, so repeated questions skip the vector search
+        self.context_cache = SemanticCache(threshold=CONTEXT_CACHE_THRESHOLD, copy=_copy_context) if SEMANTIC_CACHE_ENABLED else None
 
-    def retrieve_context(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+    @functools.lru_cache(maxsize=4096)
+    def _embed_query(self, query: str) -> Tuple[float, ...]:
+        """
+        Embed a search query with Cohere, memoized so repeated questions skip the API call
+        """
+        response = self.cohere_client.embed(
+            texts=[query],
+            model=get_settings().EMBEDDING_MODEL,  # e.g., "embed-multilingual-v3.0"
+            input_type="search_query"
+        )
+        return tuple(response.embeddings[0])
+
+    async def retrieve_context(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         """
         Retrieve relevant context chunks from the vector database based on the query
         """
@@ -31,20 +53,25 @@ class RAGService:
         logger.info(f"Starting context retrieval for query: {query[:50]}...")
 
         try:
-            # Generate embedding for the query using Cohere
-            response = self.cohere_client.embed(
-                texts=[query],
-                model=settings.EMBEDDING_MODEL,  # e.g., "embed-multilingual-v3.0"
-                input_type="search_query"
-            )
-            query_embedding = response.embeddings[0]
+            # Generate embedding for the query using Cohere (the sync client runs off the event loop)
+            query_embedding = list(await asyncio.to_thread(self._embed_query, query))
+
+            if self.context_cache is not None:
+                cached = self.context_cache.get(query_embedding)
+                # A result retrieved with a smaller top_k can't serve a larger one
+                if cached is not None and cached["top_k"] >= top_k:
+                    logger.info(f"Context retrieval served from cache in {time.time() - start_time:.2f}s")
+                    return cached["chunks"][:top_k]
 
             # Search for similar content in Qdrant
-            similar_chunks = self.qdrant_service.search_similar(
+            similar_chunks = await self.qdrant_service.search_similar_async(
                 query_embedding=query_embedding,
                 top_k=top_k
             )
 
+            if self.context_cache is not None and similar_chunks:
+                self.context_cache.put(query_embedding, {"top_k": top_k, "chunks": similar_chunks})
+
             duration = time.time() - start_time
             logger.info(f"Context retrieval completed in {duration:.2f}s, found {len(similar_chunks)} chunks")
             return similar_chunks
@@ -53,6 +80,36 @@ class RAGService:
             logger.error(f"Error retrieving context after {duration:.2f}s: {str(e)}")
             return []
 
+    async def retrieve_context_batch(self, queries: List[str], top_k: int = 5) -> List[List[Dict[str, Any]]]:
+        """
+        Retrieve context for several queries (e.g. rewrites of one question) with one Cohere call and one Qdrant request.
+        Returns one chunk list per query; use retrieve_context for a single query.
+        """
+        start_time = time.time()
+        logger.info(f"Starting batch context retrieval for {len(queries)} queries")
+
+        try:
+            # Embed all queries in a single Cohere request
+            response = await asyncio.to_thread(
+                self.cohere_client.embed,
+                texts=queries,
+                model=get_settings().EMBEDDING_MODEL,
+                input_type="search_query"
+            )
+
+            results = await self.qdrant_service.search_similar_batch_async(
+                query_embeddings=response.embeddings,
+                top_k=top_k
+            )
+
+            duration = time.time() - start_time
+            logger.info(f"Batch context retrieval completed in {duration:.2f}s")
+            return results
+        except Exception as e:
+            duration = time.time() - start_time
+            logger.error(f"Error retrieving batch context after {duration:.2f}s: {str(e)}")
+            return [[] for _ in queries]
+
     def generate_answer(self, query: str, context_chunks: List[Dict[str, Any]], use_restricted_context: bool = False) -> str:
         """
         Generate an answer based on the query and retrieved context
@@ -82,7 +139,7 @@ class RAGService:
         """
         try:
             # Retrieve relevant context
-            context_chunks = self.retrieve_context(question)
+            context_chunks = await self.retrieve_context(question)
 
             if not context_chunks:
                 logger.warning("No context chunks found for query")
@@ -91,7 +148,7 @@ class RAGService:
                     "answer": "I couldn't find relevant information in the book to answer your question.",
                     "sources": [],
                     "session_id": session_id,
-                    "timestamp": __import__('time').time()
+                    "timestamp": time.time()
                 }
 
             # Generate answer based on context
@@ -120,7 +177,7 @@ class RAGService:
                 "answer": answer,
                 "sources": sources,
                 "session_id": session_id,
-                "timestamp": __import__('time').time()
+                "timestamp": time.time()
             }
         except Exception as e:
             logger.error(f"Error in full-book query: {str(e)}")
@@ -129,7 +186,7 @@ class RAGService:
                 "answer": "Sorry, I encountered an error while processing your question.",
                 "sources": [],
                 "session_id": session_id,
-                "timestamp": __import__('time').time()
+                "timestamp": time.time()
             }
 
     async def query_selected_text(self, question: str, selected_text: str, session_id: Optional[str] = None) -> Dict[str, Any]:
@@ -170,7 +227,7 @@ class RAGService:
                 "answer": answer,
                 "sources": [],  # No sources since we're using user-provided text
                 "session_id": session_id,
-                "timestamp": __import__('time').time()
+                "timestamp": time.time()
             }
         except Exception as e:
             logger.error(f"Error in selected-text query: {str(e)}")
@@ -179,7 +236,7 @@ class RAGService:
                 "answer": "Sorry, I encountered an error while processing your question.",
                 "sources": [],
                 "session_id": session_id,
-                "timestamp": __import__('time').time()
+                "timestamp": time.time()
             }
 
 
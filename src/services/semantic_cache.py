@@ -0,0 +1,222 @@
+"""
+Response caches for the Book RAG agent.
+
+An exact-match cache keyed on the (message, selected_text) pair catches verbatim repeats
+without any model calls; the semantic cache catches paraphrases by comparing query embeddings.
+"""
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Any, List, Optional, Tuple
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Shared cache configuration
+CACHE_MAX = 10_000  # Exact-match cache capacity
+CACHE_TTL = 3600  # Seconds a cached answer stays valid
+
+# Semantic cache configuration
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+SEMANTIC_CACHE_THRESHOLD = 0.85  # Cosine similarity needed to reuse a cached answer (allows for int8 quantization error)
+SEMANTIC_CACHE_MAX_ENTRIES = 1000  # Short-term (LRU) tier capacity
+SEMANTIC_CACHE_LTM_MAX_ENTRIES = 5000  # Long-term (LFU) tier capacity
+SEMANTIC_CACHE_PROMOTE_HITS = 3  # Hits needed for an evicted entry to be promoted to the long-term tier
+
+
+def _copy_response(response: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy a cached response so callers can't mutate the cached sources list"""
+    return {**response, "sources": list(response["sources"])}
+
+
+class ExactMatchCache:
+    """
+    Bounded LRU cache of responses keyed on the exact message and selected text.
+    Keys are SHA-256 digests so long selections don't stay resident in memory.
+    """
+    def __init__(self, max_entries: int = CACHE_MAX, ttl: float = CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[bytes, bytes], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(message: str, selected_text: Optional[str]) -> Tuple[bytes, bytes]:
+        return (
+            hashlib.sha256(message.encode("utf-8")).digest(),
+            hashlib.sha256((selected_text or "").encode("utf-8")).digest(),
+        )
+
+    def get(self, message: str, selected_text: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Return the cached response for this exact request, if present and not expired"""
+        key = self._key(message, selected_text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, response = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+
+        logger.info("Exact-match cache hit")
+        return _copy_response(response)
+
+    def put(self, message: str, selected_text: Optional[str], response: Dict[str, Any]):
+        """Cache a generated response, evicting the least recently used entry when full"""
+        key = self._key(message, selected_text)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, _copy_response(response))
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class _CacheTier:
+    """
+    Fixed-capacity store of int8-quantized query embeddings and their cached responses.
+    Slots are reused on eviction so the first `size` rows of `keys` are always live.
+    """
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.keys = None  # int8 matrix (capacity, dim), allocated on first insert
+        self.scales = np.zeros(capacity, dtype=np.float32)  # Per-row dequantization scale
+        self.hits = np.zeros(capacity, dtype=np.int32)
+        self.expires = np.zeros(capacity, dtype=np.float64)  # time.monotonic() deadline per row
+        self.responses: List[Optional[Dict[str, Any]]] = [None] * capacity
+        self.order: "OrderedDict[int, None]" = OrderedDict()  # Least recently used first
+        self.size = 0
+
+    def lookup(self, query: np.ndarray, query_scale: float, now: float) -> Tuple[Optional[int], float]:
+        """Return the best matching unexpired slot and its (approximate) cosine similarity"""
+        if self.size == 0:
+            return None, -1.0
+        # Accumulate in int32: int8 products overflow int8/int16 for 1024-dim vectors
+        dots = np.einsum('ij,j->i', self.keys[:self.size], query, dtype=np.int32)
+        scores = dots * (self.scales[:self.size] * (query_scale / (127 * 127)))
+        scores[self.expires[:self.size] <= now] = -1.0
+        slot = int(np.argmax(scores))
+        return slot, float(scores[slot])
+
+    def touch(self, slot: int):
+        self.hits[slot] += 1
+        self.order.move_to_end(slot)
+
+    def is_full(self) -> bool:
+        return self.size >= self.capacity
+
+    def lru_slot(self) -> int:
+        return next(iter(self.order))
+
+    def lfu_slot(self, now: float) -> int:
+        """Least frequently used slot, treating expired entries as unused"""
+        hits = np.where(self.expires[:self.size] <= now, -1, self.hits[:self.size])
+        return int(np.argmin(hits))
+
+    def store(self, vector: np.ndarray, scale: float, response: Dict[str, Any], expires: float,
+              hits: int = 0, slot: Optional[int] = None):
+        """Store an entry, either in the next free slot or over the given slot"""
+        if self.keys is None:
+            self.keys = np.zeros((self.capacity, vector.shape[0]), dtype=np.int8)
+        if slot is None:
+            slot = self.size
+            self.size += 1
+        self.keys[slot] = vector
+        self.scales[slot] = scale
+        self.responses[slot] = response
+        self.hits[slot] = hits
+        self.expires[slot] = expires
+        self.order[slot] = None
+        self.order.move_to_end(slot)
+
+
+class SemanticCache:
+    """
+    In-process semantic cache mapping query embeddings to previously generated answers
+    (or any other per-query result, given a matching `copy` function).
+
+    New entries go into an LRU short-term tier; entries that were hit often enough are
+    promoted to a larger LFU long-term tier when they are evicted, so popular questions
+    survive bursts of one-off queries. Embeddings are stored as int8 with a per-vector
+    scale, a quarter of the memory of float32 at ~0.5% similarity error. Entries expire
+    after `ttl` seconds.
+    """
+    def __init__(self,
+                 threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+                 ltm_max_entries: int = SEMANTIC_CACHE_LTM_MAX_ENTRIES,
+                 promote_hits: int = SEMANTIC_CACHE_PROMOTE_HITS,
+                 ttl: float = CACHE_TTL,
+                 copy: Callable[[Any], Any] = _copy_response):
+        self.threshold = threshold
+        self.ttl = ttl
+        self._copy = copy  # Copies values in and out so callers can't mutate cached data
+        self.promote_hits = promote_hits
+        self.stm = _CacheTier(max_entries)
+        self.ltm = _CacheTier(ltm_max_entries)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _quantize(embedding) -> Tuple[np.ndarray, float]:
+        """L2-normalize an embedding and quantize it to int8 with a per-vector scale"""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector = vector / norm
+        scale = float(np.max(np.abs(vector))) or 1.0
+        return np.round(vector / scale * 127).astype(np.int8), scale
+
+    def get(self, embedding) -> Optional[Any]:
+        """Return the cached response for the nearest prior query, if similar enough"""
+        query, query_scale = self._quantize(embedding)
+        now = time.monotonic()
+        with self._lock:
+            best_tier, best_slot, best_score = None, None, -1.0
+            for tier in (self.stm, self.ltm):
+                slot, score = tier.lookup(query, query_scale, now)
+                if slot is not None and score > best_score:
+                    best_tier, best_slot, best_score = tier, slot, score
+
+            if best_tier is None or best_score < self.threshold:
+                return None
+
+            best_tier.touch(best_slot)
+            cached = best_tier.responses[best_slot]
+
+        logger.info(f"Semantic cache hit (similarity: {best_score:.3f})")
+        return self._copy(cached)
+
+    def put(self, embedding, response: Any):
+        """Cache a generated response under its query embedding"""
+        vector, scale = self._quantize(embedding)
+        response = self._copy(response)
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            slot = None
+            if self.stm.is_full():
+                slot = self.stm.lru_slot()
+                self._promote(slot)
+                del self.stm.order[slot]
+            self.stm.store(vector, scale, response, expires, slot=slot)
+
+    def _promote(self, slot: int):
+        """Move a frequently hit short-term entry into the long-term tier"""
+        hits = int(self.stm.hits[slot])
+        expires = float(self.stm.expires[slot])
+        now = time.monotonic()
+        if hits < self.promote_hits or expires <= now:
+            return
+
+        ltm_slot = None
+        if self.ltm.is_full():
+            ltm_slot = self.ltm.lfu_slot(now)
+            if self.ltm.expires[ltm_slot] > now and self.ltm.hits[ltm_slot] >= hits:
+                return
+        self.ltm.store(self.stm.keys[slot].copy(), float(self.stm.scales[slot]), self.stm.responses[slot], expires,
+                       hits=hits, slot=ltm_slot)
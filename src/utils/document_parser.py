@@ -1,8 +1,29 @@
+import mmap
+import multiprocessing
 import os
 import re
-from typing import List, Dict, Any, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 
+PARSE_CHUNKSIZE = 8  # Files handed to each worker process per round trip
+
+# Header patterns run over the raw mmap'd bytes; only the captured headers are decoded
+_TITLE_RE = re.compile(rb'^#\s+(.+?)\r?$', re.MULTILINE)
+_SECTION_RE = re.compile(rb'^##\s+(.+?)\r?$', re.MULTILINE)
+_SENT_RE = re.compile(r'[.!?]+\s+')
+
+
+def _parse_file_safe(file_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Process pool entry point: parse one file, reporting errors instead of raising
+    """
+    try:
+        return document_parser.parse_markdown_file(file_path)
+    except Exception as e:
+        print(f"Error parsing file {file_path}: {str(e)}")
+        return None
+
 
 class DocumentParser:
     """
@@ -16,23 +37,39 @@ class DocumentParser:
         """
         Parse a single markdown file and extract content with metadata
         """
-        with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
-
         # Extract basic metadata from file path
         path_obj = Path(file_path)
         relative_path = str(path_obj.relative_to(path_obj.anchor))
 
-        # Extract title from first H1 if available
-        title_match = re.search(r'^#\s+(.+)$', content, re.MULTILINE)
-        title = title_match.group(1) if title_match else path_obj.stem
+        with open(file_path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                # mmap can't map an empty file
+                return self._document(path_obj, relative_path, "", path_obj.stem, [])
+
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                # Extract title from first H1 if available
+                title_match = _TITLE_RE.search(data)
+                title = title_match.group(1).decode('utf-8') if title_match else path_obj.stem
 
-        # Extract sections (H2 headers)
-        sections = []
-        section_pattern = r'^##\s+(.+)$'
-        for match in re.finditer(section_pattern, content, re.MULTILINE):
-            sections.append(match.group(1))
+                # Extract sections (H2 headers)
+                sections = [match.group(1).decode('utf-8') for match in _SECTION_RE.finditer(data)]
 
+                content = str(data, 'utf-8')
+            finally:
+                data.close()
+
+        # Match text-mode reads, which translate line endings
+        if '\r' in content:
+            content = content.replace('\r\n', '\n').replace('\r', '\n')
+
+        return self._document(path_obj, relative_path, content, title, sections)
+
+    @staticmethod
+    def _document(path_obj: Path, relative_path: str, content: str, title: str, sections: List[str]) -> Dict[str, Any]:
+        """
+        Assemble the parsed document record
+        """
         return {
             "file_path": relative_path,
             "title": title,
@@ -43,18 +80,34 @@ class DocumentParser:
 
     def parse_directory(self, directory_path: str) -> List[Dict[str, Any]]:
         """
-        Parse all markdown files in a directory
+        Parse all markdown files in a directory, spreading files across worker processes
+        """
+        file_paths = [
+            os.path.join(root, file)
+            for root, dirs, files in os.walk(directory_path)
+            for file in files
+            if file.lower().endswith('.md')
+        ]
+        if len(file_paths) <= PARSE_CHUNKSIZE:
+            return self.parse_files(file_paths)
+
+        # Spawned workers start clean instead of forking the API process's threads and gRPC channels;
+        # this module is cheap to import in each one
+        with ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn")) as executor:
+            results = executor.map(_parse_file_safe, file_paths, chunksize=PARSE_CHUNKSIZE)
+            return [doc for doc in results if doc is not None]
+
+    def parse_files(self, file_paths: List[str]) -> List[Dict[str, Any]]:
+        """
+        Parse an explicit list of markdown files
         """
         documents = []
-        for root, dirs, files in os.walk(directory_path):
-            for file in files:
-                if file.lower().endswith('.md'):
-                    file_path = os.path.join(root, file)
-                    try:
-                        doc = self.parse_markdown_file(file_path)
-                        documents.append(doc)
-                    except Exception as e:
-                        print(f"Error parsing file {file_path}: {str(e)}")
+        for file_path in file_paths:
+            try:
+                doc = self.parse_markdown_file(file_path)
+                documents.append(doc)
+            except Exception as e:
+                print(f"Error parsing file {file_path}: {str(e)}")
         return documents
 
     def extract_content_chunks(self, content: str, max_chunk_size: int = 1024, overlap: int = 100) -> List[str]:
@@ -64,25 +117,35 @@ class DocumentParser:
         chunks = []
 
         # Split content into sentences to avoid breaking sentences
-        sentences = re.split(r'[.!?]+\s+', content)
+        sentences = _SENT_RE.split(content)
 
-        current_chunk = ""
+        # Sentences of the chunk being built; joined once when the chunk is emitted
+        current_parts = []
+        current_len = 0  # len(" ".join(current_parts))
         for sentence in sentences:
             # If adding the sentence would exceed the chunk size
-            if len(current_chunk) + len(sentence) > max_chunk_size:
+            if current_len + len(sentence) > max_chunk_size:
+                current_chunk = " ".join(current_parts)
                 if current_chunk.strip():
                     # Add the current chunk to the list
                     chunks.append(current_chunk.strip())
 
                 # Start a new chunk with some overlap from the previous chunk
-                if overlap > 0 and len(current_chunk) > overlap:
-                    current_chunk = current_chunk[-overlap:] + " " + sentence
+                if overlap > 0 and current_len > overlap:
+                    current_parts = [current_chunk[-overlap:], sentence]
+                    current_len = overlap + 1 + len(sentence)
                 else:
-                    current_chunk = sentence
+                    current_parts = [sentence]
+                    current_len = len(sentence)
+            elif current_len:
+                current_parts.append(sentence)
+                current_len += 1 + len(sentence)
             else:
-                current_chunk += " " + sentence if current_chunk else sentence
+                current_parts = [sentence]
+                current_len = len(sentence)
 
         # Add the last chunk if it has content
+        current_chunk = " ".join(current_parts)
         if current_chunk.strip():
             chunks.append(current_chunk.strip())
 
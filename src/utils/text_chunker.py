@@ -1,5 +1,16 @@
 import re
-from typing import List, Tuple, Dict, Any
+from bisect import bisect_right
+from types import MappingProxyType
+from typing import List, Tuple, Dict, Any, Iterator
+
+MIN_CHUNK_LENGTH = 50
+MAX_CHUNK_LENGTH = 2000
+VALID_CHUNK = (True, "Valid chunk")
+MIN_BREAK_OFFSET = 100  # Natural breaks closer than this to the chunk start are ignored
+
+_BOUNDARY_RE = re.compile(r'\n|\. ')
+_SPACE_RE = re.compile(r' ')
+_NO_METADATA = MappingProxyType({})
 
 
 class TextChunker:
@@ -14,96 +25,97 @@ class TextChunker:
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
 
-    def split_text(self, text: str) -> List[str]:
+    def iter_split_text(self, text: str) -> Iterator[str]:
         """
-        Split text into chunks using simple character-based splitting with overlap
+        Split text into chunks using simple character-based splitting with overlap,
+        yielding each chunk as it is produced
         """
         if not text:
-            return []
+            return
+
+        # Candidate break offsets (just past a newline or sentence end), found in one pass;
+        # word boundaries are the fallback when a window holds no sentence break
+        text_len = len(text)
+        boundaries = [m.end() for m in _BOUNDARY_RE.finditer(text)]
+        spaces = [m.end() for m in _SPACE_RE.finditer(text)]
 
-        chunks = []
         start = 0
 
-        while start < len(text):
+        while start < text_len:
             end = start + self.chunk_size
 
-            # If we're not at the end, try to split at a natural break point
-            if end < len(text):
-                # Look for natural break points (newlines, periods, etc.)
-                search_text = text[start:end]
-                last_newline = search_text.rfind('\n')
-                last_period = search_text.rfind('. ')
-                last_space = search_text.rfind(' ')
-
-                # Choose the best break point
-                break_point = last_newline if last_newline > last_period else last_period
-                if break_point < self.chunk_size - 50:  # Only use if not too far from end
-                    break_point = last_space
-
-                if break_point > start + 100:  # Ensure chunk is not too small
-                    end = start + break_point + 1
+            # If we're not at the end, split at the last natural break that keeps the chunk from being too small.
+            # Breaks must also lie past the overlap, or the next chunk would start at or before this one.
+            if end < text_len:
+                min_end = start + max(MIN_BREAK_OFFSET, self.chunk_overlap)
+                for offsets in (boundaries, spaces):
+                    i = bisect_right(offsets, end) - 1
+                    if i >= 0 and offsets[i] > min_end:
+                        end = offsets[i]
+                        break
 
             chunk = text[start:end].strip()
             if chunk:
-                chunks.append(chunk)
+                yield chunk
 
-            # Move start position, accounting for overlap
-            start = end - self.chunk_overlap
-            if start < 0:
-                start = 0
+            if end >= text_len:
+                break
 
-        return chunks
+            # Move start position, accounting for overlap
+            start = max(end - self.chunk_overlap, 0)
 
-    def chunk_text(self, text: str, metadata: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    def split_text(self, text: str) -> List[str]:
         """
-        Chunk the input text and return list of chunks with metadata
+        Split text into chunks using simple character-based splitting with overlap
         """
-        if metadata is None:
-            metadata = {}
+        return list(self.iter_split_text(text))
 
-        chunks = self.split_text(text)
+    def iter_chunk_text(self, text: str, metadata: Dict[str, Any] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Chunk the input text, yielding chunks with metadata one at a time
+        """
+        # One read-only view shared by every chunk instead of a dict copy per chunk
+        shared_metadata = MappingProxyType(metadata) if metadata else _NO_METADATA
 
-        chunked_data = []
-        for i, chunk in enumerate(chunks):
-            chunk_data = {
+        for i, chunk in enumerate(self.iter_split_text(text)):
+            yield {
                 "content": chunk,
                 "chunk_index": i,
-                "metadata": metadata.copy(),
+                "metadata": shared_metadata,
                 "length": len(chunk)
             }
-            chunked_data.append(chunk_data)
 
-        return chunked_data
+    def chunk_text(self, text: str, metadata: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """
+        Chunk the input text and return list of chunks with metadata
+        """
+        return list(self.iter_chunk_text(text, metadata))
+
+    def iter_chunk_markdown(self, markdown_text: str, metadata: Dict[str, Any] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming form of chunk_markdown, so callers can process chunks without holding them all in memory
+        """
+        return self.iter_chunk_text(markdown_text, metadata)
 
     def chunk_markdown(self, markdown_text: str, metadata: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         """
         Specialized method for chunking markdown content while preserving structure
         """
-        if metadata is None:
-            metadata = {}
-
-        chunks = self.chunk_text(markdown_text, metadata)
-
-        # Add markdown-specific processing if needed
-        for chunk in chunks:
-            content = chunk["content"]
-            code_block_count = content.count("```")
-            if code_block_count % 2 == 1:
-                pass
-
-        return chunks
+        return list(self.iter_chunk_markdown(markdown_text, metadata))
 
     def validate_chunk(self, chunk: str) -> Tuple[bool, str]:
         """
-        Validate that a chunk meets the requirements
+        Validate that a chunk meets the requirements.
+        This is two length comparisons, cheaper than hashing the chunk to memoize the result.
         """
-        if len(chunk) < 50:
-            return False, "Chunk too short (less than 50 characters)"
+        length = len(chunk)
+        if MIN_CHUNK_LENGTH <= length <= MAX_CHUNK_LENGTH:
+            return VALID_CHUNK
 
-        if len(chunk) > 2000:
-            return False, "Chunk too long (more than 2000 characters)"
+        if length < MIN_CHUNK_LENGTH:
+            return False, "Chunk too short (less than 50 characters)"
 
-        return True, "Valid chunk"
+        return False, "Chunk too long (more than 2000 characters)"
 
 
 # Global instance of TextChunker
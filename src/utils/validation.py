@@ -1,19 +1,23 @@
 from typing import Tuple
 import re
 
+_SESSION_RE = re.compile(r'^[a-zA-Z0-9-_]+$')
+_SOURCE_MODES = frozenset(('full', 'selected'))
+
 
 def validate_question_content(content: str) -> Tuple[bool, str]:
     """
     Validate question content according to requirements
     - Must be between 5 and 1000 characters
     """
-    if len(content) < 5:
-        return False, "Question content must be at least 5 characters long"
+    length = len(content)
+    if 5 <= length <= 1000:
+        return True, "Valid question content"
 
-    if len(content) > 1000:
-        return False, "Question content must be no more than 1000 characters long"
+    if length < 5:
+        return False, "Question content must be at least 5 characters long"
 
-    return True, "Valid question content"
+    return False, "Question content must be no more than 1000 characters long"
 
 
 def validate_book_content_chunk(content: str) -> Tuple[bool, str]:
@@ -21,13 +25,14 @@ def validate_book_content_chunk(content: str) -> Tuple[bool, str]:
     Validate book content chunk according to requirements
     - Must be between 50 and 2000 characters
     """
-    if len(content) < 50:
-        return False, "Book content chunk must be at least 50 characters long"
+    length = len(content)
+    if 50 <= length <= 2000:
+        return True, "Valid book content chunk"
 
-    if len(content) > 2000:
-        return False, "Book content chunk must be no more than 2000 characters long"
+    if length < 50:
+        return False, "Book content chunk must be at least 50 characters long"
 
-    return True, "Valid book content chunk"
+    return False, "Book content chunk must be no more than 2000 characters long"
 
 
 def validate_session_id(session_id: str) -> Tuple[bool, str]:
@@ -35,7 +40,7 @@ def validate_session_id(session_id: str) -> Tuple[bool, str]:
     Validate session ID according to requirements
     - Must follow the format /[a-zA-Z0-9-_]+/
     """
-    if not re.match(r'^[a-zA-Z0-9-_]+$', session_id):
+    if not _SESSION_RE.match(session_id):
         return False, "Session ID must contain only alphanumeric characters, hyphens, and underscores"
 
     return True, "Valid session ID"
@@ -46,7 +51,7 @@ def validate_source_mode(source_mode: str) -> Tuple[bool, str]:
     Validate source mode according to requirements
     - Must be either 'full' or 'selected'
     """
-    if source_mode not in ['full', 'selected']:
+    if source_mode not in _SOURCE_MODES:
         return False, "Source mode must be either 'full' or 'selected'"
 
     return True, "Valid source mode"
@@ -58,10 +63,11 @@ def validate_selected_text_length(selected_text: str) -> Tuple[bool, str]:
     - Should be at least 10 characters for meaningful context
     - Should be no more than 5000 characters to prevent API limits
     """
-    if len(selected_text) < 10:
-        return False, "Selected text must be at least 10 characters long for meaningful context"
+    length = len(selected_text)
+    if 10 <= length <= 5000:
+        return True, "Valid selected text length"
 
-    if len(selected_text) > 5000:
-        return False, "Selected text must be no more than 5000 characters long to prevent API limits"
+    if length < 10:
+        return False, "Selected text must be at least 10 characters long for meaningful context"
 
-    return True, "Valid selected text length"
\ No newline at end of file
+    return False, "Selected text must be no more than 5000 characters long to prevent API limits"
\ No newline at end of file
@@ -1,148 +1,151 @@
 # Test script to validate frontend-backend integration
 
-import requests
+import argparse
+import asyncio
+import logging
+import sys
 import time
-import json
+import httpx
+import orjson
+
+# Report through a dedicated logger so httpx's request logs stay out of the output
+log = logging.getLogger("test_integration")
+log.setLevel(logging.INFO)
+log.propagate = False
+_handler = logging.StreamHandler(sys.stdout)
+_handler.setFormatter(logging.Formatter("%(message)s"))
+log.addHandler(_handler)
 
 # Base URL for the backend API
 BASE_URL = "http://localhost:8000/api"
-
-def test_health():
-    """Test the health endpoint"""
+READY_TIMEOUT = 15.0  # Seconds to wait for the server to start answering health checks
+
+async def wait_ready(client: httpx.AsyncClient, deadline: float = READY_TIMEOUT) -> bool:
+    """Poll the health endpoint with exponential backoff (50ms doubling up to 1s) until the server answers"""
+    start = time.monotonic()
+    delay = 0.05
+    while time.monotonic() - start < deadline:
+        try:
+            response = await client.get("/health", timeout=1)
+            if response.status_code == 200:
+                return True
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 1.0)
+    return False
+
+async def check_health(client: httpx.AsyncClient):
+    """Test the health endpoint, including revalidation of the cached response"""
     try:
-        response = requests.get(f"{BASE_URL}/health")
+        response = await client.get("/health")
         if response.status_code == 200:
-            print("✓ Health check passed")
-            return True
+            log.info("✓ Health check passed")
         else:
-            print(f"✗ Health check failed: {response.status_code}")
+            log.info(f"✗ Health check failed: {response.status_code}")
             return False
-    except Exception as e:
-        print(f"✗ Health check error: {e}")
-        return False
 
-def test_query():
-    """Test the query endpoint"""
-    try:
-        payload = {
-            "question": "What is this book about?"
-        }
-        response = requests.post(f"{BASE_URL}/query", json=payload)
-        if response.status_code == 200:
-            data = response.json()
-            if "answer" in data:
-                print("✓ Query endpoint test passed")
-                return True
+        etag = response.headers.get("etag")
+        if etag:
+            response = await client.get("/health", headers={"If-None-Match": etag})
+            if response.status_code in (200, 304):
+                log.info(f"✓ Health revalidation passed ({response.status_code})")
             else:
-                print(f"✗ Query endpoint missing answer: {data}")
+                log.info(f"✗ Health revalidation failed: {response.status_code}")
                 return False
-        else:
-            print(f"✗ Query endpoint failed: {response.status_code} - {response.text}")
-            return False
+        return True
     except Exception as e:
-        print(f"✗ Query endpoint error: {e}")
+        log.info(f"✗ Health check error: {e}")
         return False
 
-def test_select_query():
-    """Test the select-query endpoint"""
+# Request bodies are serialized once, not on every call
+_QUERY_PAYLOAD = orjson.dumps({"question": "What is this book about?"})
+_SELECT_PAYLOAD = orjson.dumps({
+    "question": "What does this text mean?",
+    "selected_text": "This is a sample text selection for testing purposes."
+})
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Endpoint checks as (name, method, path, JSON body bytes, accepted status codes, key the response must contain)
+ENDPOINT_CHECKS = [
+    ("Query endpoint", "POST", "/query", _QUERY_PAYLOAD, (200,), "answer"),
+    ("Select-query endpoint", "POST", "/select-query", _SELECT_PAYLOAD, (200,), "answer"),
+    ("Embeddings count endpoint", "GET", "/embeddings/count", None, (200,), "count"),
+    # POST triggers embedding
+    ("Embed endpoint", "POST", "/embed", None, (200, 202), None),
+    ("Logs endpoint", "GET", "/logs?limit=5", None, (200,), "logs"),
+]
+
+async def check_endpoint(client: httpx.AsyncClient, name, method, path, payload, statuses, key):
+    """Call an endpoint and check its status code and, if given, that the response has the expected key"""
     try:
-        payload = {
-            "question": "What does this text mean?",
-            "selected_text": "This is a sample text selection for testing purposes."
-        }
-        response = requests.post(f"{BASE_URL}/select-query", json=payload)
-        if response.status_code == 200:
-            data = response.json()
-            if "answer" in data:
-                print("✓ Select-query endpoint test passed")
-                return True
-            else:
-                print(f"✗ Select-query endpoint missing answer: {data}")
-                return False
+        if payload is None:
+            response = await client.request(method, path)
         else:
-            print(f"✗ Select-query endpoint failed: {response.status_code} - {response.text}")
+            response = await client.request(method, path, content=payload, headers=_JSON_HEADERS)
+        if response.status_code not in statuses:
+            log.info(f"✗ {name} failed: {response.status_code} - {response.text}")
             return False
-    except Exception as e:
-        print(f"✗ Select-query endpoint error: {e}")
-        return False
 
-def test_embedding_endpoints():
-    """Test the embedding endpoints"""
-    try:
-        # Test embeddings count
-        response = requests.get(f"{BASE_URL}/embeddings/count")
-        if response.status_code == 200:
-            data = response.json()
-            if "count" in data:
-                print("✓ Embeddings count endpoint test passed")
-                print(f"  Current embedding count: {data['count']}")
-            else:
-                print(f"✗ Embeddings count endpoint missing count: {data}")
-        else:
-            print(f"✗ Embeddings count endpoint failed: {response.status_code} - {response.text}")
+        if key is not None:
+            data = orjson.loads(response.content)
+            if key not in data:
+                log.info(f"✗ {name} missing {key}: {data}")
+                return False
 
-        # Test embed endpoint (POST request to trigger embedding)
-        response = requests.post(f"{BASE_URL}/embed")
-        if response.status_code in [200, 202]:
-            print("✓ Embed endpoint test passed")
-            return True
-        else:
-            print(f"✗ Embed endpoint failed: {response.status_code} - {response.text}")
-            return False
+        log.info(f"✓ {name} test passed")
+        return True
     except Exception as e:
-        print(f"✗ Embedding endpoints error: {e}")
+        log.info(f"✗ {name} error: {e}")
         return False
 
-def test_logs_endpoint():
-    """Test the logs endpoint"""
+async def run_checks(client: httpx.AsyncClient, fail_fast: bool = False) -> bool:
+    """Run every check concurrently; with fail_fast, cancel the rest as soon as one fails"""
+    tasks = [asyncio.create_task(check_health(client))]
+    tasks += [asyncio.create_task(check_endpoint(client, *check)) for check in ENDPOINT_CHECKS]
+
+    if not fail_fast:
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        return all(result is True for result in results)
+
     try:
-        response = requests.get(f"{BASE_URL}/logs?limit=5")
-        if response.status_code == 200:
-            data = response.json()
-            if "logs" in data:
-                print("✓ Logs endpoint test passed")
-                return True
-            else:
-                print(f"✗ Logs endpoint missing logs: {data}")
+        for next_done in asyncio.as_completed(tasks):
+            if await next_done is not True:
+                log.info("✗ Stopping at first failure (--fail-fast)")
                 return False
-        else:
-            print(f"✗ Logs endpoint failed: {response.status_code} - {response.text}")
+        return True
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+async def main(fail_fast: bool = False):
+    log.info("Testing RAG Chatbot Backend Integration...")
+    log.info("="*50)
+
+    # The checks are independent, so run them concurrently over one pooled client;
+    # total time is the slowest check rather than the sum of all of them. Against an
+    # HTTPS deployment HTTP/2 multiplexes every check over a single connection.
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=60, http2=True) as client:
+        # Start as soon as the server is up instead of after a fixed delay
+        if not await wait_ready(client):
+            log.info(f"✗ Server at {BASE_URL} not ready after {READY_TIMEOUT:.0f}s")
             return False
-    except Exception as e:
-        print(f"✗ Logs endpoint error: {e}")
-        return False
-
-def main():
-    print("Testing RAG Chatbot Backend Integration...")
-    print("="*50)
-
-    # Wait a bit to ensure the server is running
-    time.sleep(2)
-
-    all_tests_passed = True
-
-    print("\n1. Testing health endpoint...")
-    all_tests_passed &= test_health()
-
-    print("\n2. Testing query endpoint...")
-    all_tests_passed &= test_query()
-
-    print("\n3. Testing select-query endpoint...")
-    all_tests_passed &= test_select_query()
-
-    print("\n4. Testing embedding endpoints...")
-    all_tests_passed &= test_embedding_endpoints()
 
-    print("\n5. Testing logs endpoint...")
-    all_tests_passed &= test_logs_endpoint()
+        all_tests_passed = await run_checks(client, fail_fast)
 
-    print("\n" + "="*50)
+    log.info("\n" + "="*50)
     if all_tests_passed:
-        print("✓ All integration tests passed!")
+        log.info("✓ All integration tests passed!")
     else:
-        print("✗ Some tests failed")
+        log.info("✗ Some tests failed")
 
     return all_tests_passed
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Check the backend API endpoints")
+    parser.add_argument("--fail-fast", action="store_true",
+                        help="stop and cancel the remaining checks at the first failure")
+    args = parser.parse_args()
+    success = asyncio.run(main(fail_fast=args.fail_fast))
+    sys.exit(0 if success else 1)
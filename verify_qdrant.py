@@ -3,161 +3,169 @@ Verify Qdrant collection and data
 """
 import os
 import sys
+import asyncio
+import logging
+import numpy as np
 from dotenv import load_dotenv
 
 # Fix Windows console encoding
-import io
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+sys.stdout.reconfigure(encoding='utf-8')
+
+# Report through a dedicated logger so library INFO logs (httpx, etc.) stay out of the output
+log = logging.getLogger("verify_qdrant")
+log.setLevel(logging.INFO)
+log.propagate = False
+_handler = logging.StreamHandler(sys.stdout)
+_handler.setFormatter(logging.Formatter("%(message)s"))
+log.addHandler(_handler)
 
 # Load environment variables
 load_dotenv()
 
-from qdrant_client import QdrantClient
-from src.connection import get_connection_manager
 
 def verify_qdrant():
     """Verify Qdrant collection and data"""
-    print("=" * 60)
-    print("QDRANT VERIFICATION")
-    print("=" * 60)
+    log.info("=" * 60)
+    log.info("QDRANT VERIFICATION")
+    log.info("=" * 60)
 
     try:
+        # Imported here so loading this module doesn't pull in the Cohere/Qdrant client stack
+        from src.connection import get_connection_manager
+
         # Get connection manager
         conn = get_connection_manager()
         client = conn.qdrant_client
         collection_name = conn.collection_name
 
-        print(f"\n✓ Connected to Qdrant")
-        print(f"  URL: {os.getenv('QDRANT_URL')}")
-        print(f"  Collection: {collection_name}")
+        log.info(f"\n✓ Connected to Qdrant")
+        log.info(f"  URL: {os.getenv('QDRANT_URL')}")
+        log.info(f"  Collection: {collection_name}")
 
         # Check if collection exists
-        print(f"\n[1] Checking if collection '{collection_name}' exists...")
+        log.info(f"\n[1] Checking if collection '{collection_name}' exists...")
         try:
             collections = client.get_collections().collections
             collection_names = [c.name for c in collections]
 
             if collection_name in collection_names:
-                print(f"  ✓ Collection '{collection_name}' EXISTS")
+                log.info(f"  ✓ Collection '{collection_name}' EXISTS")
             else:
-                print(f"  ✗ Collection '{collection_name}' NOT FOUND")
-                print(f"  Available collections: {collection_names}")
-                print(f"\n  ⚠ You need to run the embedding script:")
-                print(f"     python run_embedding.py")
+                log.info(f"  ✗ Collection '{collection_name}' NOT FOUND")
+                log.info(f"  Available collections: {collection_names}")
+                log.info(f"\n  ⚠ You need to run the embedding script:")
+                log.info(f"     python run_embedding.py")
                 return False
         except Exception as e:
-            print(f"  ✗ Error checking collections: {e}")
+            log.info(f"  ✗ Error checking collections: {e}")
             return False
 
         # Get collection info
-        print(f"\n[2] Getting collection info...")
+        log.info(f"\n[2] Getting collection info...")
         try:
             collection_info = client.get_collection(collection_name)
             vector_count = collection_info.points_count
             vector_size = collection_info.config.params.vectors.size
 
-            print(f"  ✓ Collection info retrieved")
-            print(f"    Vector count: {vector_count}")
-            print(f"    Vector dimension: {vector_size}")
+            log.info(f"  ✓ Collection info retrieved")
+            log.info(f"    Vector count: {vector_count}")
+            log.info(f"    Vector dimension: {vector_size}")
 
             if vector_count == 0:
-                print(f"\n  ✗ Collection is EMPTY (no vectors)")
-                print(f"     You need to run the embedding script:")
-                print(f"     python run_embedding.py")
+                log.info(f"\n  ✗ Collection is EMPTY (no vectors)")
+                log.info(f"     You need to run the embedding script:")
+                log.info(f"     python run_embedding.py")
                 return False
             else:
-                print(f"  ✓ Collection has data ({vector_count} vectors)")
+                log.info(f"  ✓ Collection has data ({vector_count} vectors)")
         except Exception as e:
-            print(f"  ✗ Error getting collection info: {e}")
+            log.info(f"  ✗ Error getting collection info: {e}")
             return False
 
         # Test embedding
-        print(f"\n[3] Testing embedding generation...")
+        log.info(f"\n[3] Testing embedding generation...")
+        test_queries = [
+            "What is ROS 2?",
+            "Explain NVIDIA Isaac Sim",
+            "What are VLAs in robotics?"
+        ]
         try:
-            test_text = "What is ROS 2?"
-            embeddings = conn.embed([test_text])
-            embedding_dim = len(embeddings[0])
+            # Embed every test query in a single Cohere request; step [4] searches with these same vectors
+            # Kept as one contiguous float32 matrix; its rows go to Qdrant without list conversion
+            query_embeddings = np.asarray(conn.embed(test_queries), dtype=np.float32)
+            test_text = test_queries[0]
+            embedding_dim = query_embeddings.shape[1]
 
-            print(f"  ✓ Embedding generated successfully")
-            print(f"    Input: '{test_text}'")
-            print(f"    Embedding dimension: {embedding_dim}")
+            log.info(f"  ✓ Embedding generated successfully")
+            log.info(f"    Input: '{test_text}'")
+            log.info(f"    Embedding dimension: {embedding_dim}")
 
             if embedding_dim != vector_size:
-                print(f"  ✗ DIMENSION MISMATCH!")
-                print(f"     Cohere embedding: {embedding_dim}")
-                print(f"     Qdrant collection: {vector_size}")
-                print(f"     This will cause search failures!")
+                log.info(f"  ✗ DIMENSION MISMATCH!")
+                log.info(f"     Cohere embedding: {embedding_dim}")
+                log.info(f"     Qdrant collection: {vector_size}")
+                log.info(f"     This will cause search failures!")
                 return False
         except Exception as e:
-            print(f"  ✗ Error generating embedding: {e}")
+            log.info(f"  ✗ Error generating embedding: {e}")
             return False
 
         # Test Qdrant search
-        print(f"\n[4] Testing Qdrant similarity search...")
+        log.info(f"\n[4] Testing Qdrant similarity search...")
         try:
-            test_queries = [
-                "What is ROS 2?",
-                "Explain NVIDIA Isaac Sim",
-                "What are VLAs in robotics?"
-            ]
+            # Search every test query in a single Qdrant request
+            batch_results = conn.qdrant_search_batch(query_embeddings, top_k=3)
 
-            for query in test_queries:
-                print(f"\n  Query: '{query}'")
-                query_embedding = conn.embed([query])[0]
-                results = conn.qdrant_search(query_embedding, top_k=3)
+            for query, results in zip(test_queries, batch_results):
+                log.info(f"\n  Query: '{query}'")
 
                 if len(results) == 0:
-                    print(f"    ✗ No results found")
+                    log.info(f"    ✗ No results found")
                 else:
-                    print(f"    ✓ Found {len(results)} results:")
+                    log.info(f"    ✓ Found {len(results)} results:")
                     for i, result in enumerate(results, 1):
-                        print(f"      {i}. Score: {result['relevance_score']:.3f}")
-                        print(f"         Section: {result.get('section', 'N/A')}")
-                        print(f"         File: {result.get('file_path', 'N/A')}")
+                        log.info(f"      {i}. Score: {result['relevance_score']:.3f}")
+                        log.info(f"         Section: {result.get('section', 'N/A')}")
+                        log.info(f"         File: {result.get('file_path', 'N/A')}")
                         content_preview = result['content'][:100] + "..." if len(result['content']) > 100 else result['content']
-                        print(f"         Content: {content_preview}")
+                        log.info(f"         Content: {content_preview}")
         except Exception as e:
-            print(f"  ✗ Error testing search: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception(f"  ✗ Error testing search: {e}")
             return False
 
         # Test RAG agent
-        print(f"\n[5] Testing RAG agent end-to-end...")
+        log.info(f"\n[5] Testing RAG agent end-to-end...")
         try:
-            from src.app import book_rag_agent
+            from src.app import get_book_rag_agent
+            book_rag_agent = get_book_rag_agent()
 
             test_message = "What are the key features of ROS 2?"
-            print(f"  Query: '{test_message}'")
+            log.info(f"  Query: '{test_message}'")
 
-            result = book_rag_agent.run(test_message)
+            result = asyncio.run(book_rag_agent.run(test_message))
 
-            print(f"  ✓ Agent response received")
-            print(f"    Answer length: {len(result['answer'])} characters")
-            print(f"    Sources: {len(result.get('sources', []))}")
-            print(f"    Context used: {result.get('context_used', False)}")
-            print(f"\n  Answer preview:")
-            print(f"    {result['answer'][:200]}...")
+            log.info(f"  ✓ Agent response received")
+            log.info(f"    Answer length: {len(result['answer'])} characters")
+            log.info(f"    Sources: {len(result.get('sources', []))}")
+            log.info(f"    Context used: {result.get('context_used', False)}")
+            log.info(f"\n  Answer preview:")
+            log.info(f"    {result['answer'][:200]}...")
 
             if result.get('sources'):
-                print(f"\n  Sources:")
+                log.info(f"\n  Sources:")
                 for i, source in enumerate(result['sources'][:3], 1):
-                    print(f"    {i}. {source.get('section', 'N/A')} (score: {source.get('relevance_score', 0):.3f})")
+                    log.info(f"    {i}. {source.get('section', 'N/A')} (score: {source.get('relevance_score', 0):.3f})")
         except Exception as e:
-            print(f"  ✗ Error testing RAG agent: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception(f"  ✗ Error testing RAG agent: {e}")
             return False
 
-        print("\n" + "=" * 60)
-        print("✓ ALL CHECKS PASSED - Qdrant is working correctly")
-        print("=" * 60)
+        log.info("\n" + "=" * 60)
+        log.info("✓ ALL CHECKS PASSED - Qdrant is working correctly")
+        log.info("=" * 60)
         return True
 
     except Exception as e:
-        print(f"\n✗ FATAL ERROR: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception(f"\n✗ FATAL ERROR: {e}")
         return False
 
 if __name__ == "__main__":